@@ -0,0 +1,52 @@
+import asyncio
+import re
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Tuple
+
+# Word-sized pieces that concatenate back to the original text
+_PIECE_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class GenerationBackend(ABC):
+    """Interface for text generators that decode a changing batch of sequences step by step.
+
+    Sequences join the batch through prefill() and advance one token per
+    decode_step(); the scheduler may add new sequences between any two
+    steps, so the backend must not assume the batch is fixed.
+    """
+
+    @abstractmethod
+    async def prefill(self, prompts: List[str]) -> List[Any]:
+        """Process new prompts and return one decoding state per prompt."""
+
+    @abstractmethod
+    async def decode_step(self, states: List[Any]) -> List[Optional[str]]:
+        """Advance every sequence by one step and return its next token.
+
+        A sequence's entry is None once its response is complete; the
+        scheduler then drops its state from later steps.
+        """
+
+    def format_prompt(self, history: List[Tuple[str, str]], message: str) -> str:
+        """Build the model input from earlier (role, text) turns and the new message."""
+        lines = [f"{role}: {text}" for role, text in history]
+        lines.append(f"user: {message}")
+        return "\n".join(lines)
+
+
+class EchoBackend(GenerationBackend):
+    """Deterministic local stand-in: replies "You said: <message>" one word per step."""
+
+    def __init__(self, step_delay: float = 0.0):
+        self.step_delay = step_delay
+
+    def format_prompt(self, history: List[Tuple[str, str]], message: str) -> str:
+        return message  # only ever echoes the latest message
+
+    async def prefill(self, prompts: List[str]) -> List[Any]:
+        return [iter(_PIECE_PATTERN.findall(f"You said: {prompt}")) for prompt in prompts]
+
+    async def decode_step(self, states: List[Any]) -> List[Optional[str]]:
+        # Simulates one forward pass for the whole batch
+        await asyncio.sleep(self.step_delay)
+        return [next(pieces, None) for pieces in states]
@@ -0,0 +1,48 @@
+"""Requests/second and latency percentiles of the chat endpoints under concurrent load.
+
+Messages are synthetic texts of a given word count; the session scenario
+spreads requests over many session ids so history and eviction are
+exercised. Runs in-process by default, or against a local uvicorn:
+
+    python -m benchmarks.load --sizes 10 200 --concurrency 32
+    python -m benchmarks.load --mode uvicorn --concurrency 64
+    CHAT_STEP_DELAY_MS=5 python -m benchmarks.load    # simulate a slow backend
+    python -m benchmarks.load --save-baseline        # accept the current numbers
+
+Exits with status 1 when a result regresses against benchmarks/baselines/load.json.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.loadgen import Scenario, add_load_arguments, report, run_suite, synthetic_text
+
+# Distinct messages (and sessions) per scenario, sent round-robin
+MESSAGES_PER_SCENARIO = 64
+
+
+def build_scenarios(sizes):
+    scenarios = []
+    for words in sizes:
+        messages = [synthetic_text(words, seed) for seed in range(MESSAGES_PER_SCENARIO)]
+        scenarios.append(Scenario(f"POST /chat {words}w", [
+            {"method": "POST", "url": "/chat", "json": {"message": m}} for m in messages]))
+        scenarios.append(Scenario(f"POST /chat/stream {words}w", [
+            {"method": "POST", "url": "/chat/stream", "json": {"message": m}} for m in messages]))
+        scenarios.append(Scenario(f"POST /chat sessions {words}w", [
+            {"method": "POST", "url": "/chat", "json": {"message": m, "session_id": f"bench-{i}"}}
+            for i, m in enumerate(messages)]))
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 200], help="Words per message")
+    add_load_arguments(parser, Path(__file__).parent / "baselines" / "load.json")
+    args = parser.parse_args()
+    results = run_suite(build_scenarios(args.sizes), args, "main:app")
+    sys.exit(report(results, args))
+
+
+if __name__ == "__main__":
+    main()
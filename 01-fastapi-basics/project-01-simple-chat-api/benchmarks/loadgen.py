@@ -0,0 +1,295 @@
+"""Load generation and baseline comparison.
+
+Each service in this track keeps its own copy of this module next to its
+benchmarks, trimmed to what they use (this one has no micro-benchmark
+timing). A suite builds Scenario objects and run_suite() sends each one with a
+fixed number of concurrent clients, in one of three modes:
+
+- inprocess  straight to the ASGI app over httpx, startup/shutdown included
+- uvicorn    to a local uvicorn started for the run (--workers processes)
+- url        to a server that is already running (--url)
+
+Every scenario reports requests/s and p50/p95/p99 latency; peak RSS of the
+serving process(es) is reported once per run. report() compares results
+with a stored baseline JSON file and flags anything slower, or bigger, by
+more than --tolerance; --save-baseline records the current numbers instead.
+p95/p99 are only compared when both runs timed at least MIN_TAIL_REQUESTS
+requests: with fewer, a handful of slow requests decides the tail.
+Baseline keys include the mode and concurrency, so runs only ever compare
+like with like. Numbers are machine specific: save a baseline on the
+machine that will run the comparison.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import random
+import socket
+import string
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+MODES = ("inprocess", "uvicorn", "url")
+# Metrics where a larger value is worse; throughput is the only "higher is better" one
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+TAIL_PERCENTILES = ("p95_ms", "p99_ms")
+MIN_TAIL_REQUESTS = 1000
+STOPWORDS = ("the", "of", "and", "to", "a", "in", "is", "that", "for", "it", "with", "as", "on", "was")
+
+
+class Scenario:
+    """A named list of requests, each a dict of httpx request() arguments, sent round-robin."""
+
+    def __init__(self, name: str, requests: Sequence[Dict[str, Any]]):
+        self.name = name
+        self.requests = list(requests)
+
+
+def synthetic_text(words: int, seed: int = 0, vocabulary: int = 5000) -> str:
+    """Deterministic English-like text of exactly `words` words.
+
+    Word ranks follow a Zipf distribution with common stopwords on top, and
+    words form capitalised sentences with commas and end punctuation, so
+    cleaning, tokenizing and keyword extraction all do realistic work.
+    """
+    rng = random.Random(seed)
+    letters = string.ascii_lowercase
+    vocab = list(STOPWORDS) + ["".join(rng.choices(letters, k=rng.randint(3, 10)))
+                               for _ in range(vocabulary - len(STOPWORDS))]
+    cum_weights = list(_accumulate(1 / rank for rank in range(1, len(vocab) + 1)))
+    chosen = rng.choices(vocab, cum_weights=cum_weights, k=words)
+    sentences = []
+    start = 0
+    while start < words:
+        sentence = chosen[start:start + rng.randint(8, 20)]
+        start += len(sentence)
+        sentence[0] = sentence[0].capitalize()
+        if len(sentence) > 6:
+            sentence[len(sentence) // 2] += ","
+        sentences.append(" ".join(sentence) + rng.choice(".!?"))
+    return " ".join(sentences)
+
+
+def _accumulate(values) -> Iterator[float]:
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+    }
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak resident set size of this process, or of its finished children."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+async def run_load(client: httpx.AsyncClient, scenario: Scenario, total: int,
+                   concurrency: int) -> Dict[str, float]:
+    """Send `total` requests from `concurrency` clients; non-2xx/3xx responses count as errors."""
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+
+    async def worker():
+        nonlocal errors, sent
+        while sent < total:
+            request = scenario.requests[sent % len(scenario.requests)]
+            sent += 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                errors += response.status_code >= 400
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def import_app(app_path: str):
+    module, _, name = app_path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+@asynccontextmanager
+async def asgi_client(app, timeout: float):
+    """httpx client calling the ASGI app directly, with its lifespan running."""
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=timeout) as client:
+            yield client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def uvicorn_server(app_path: str, workers: int = 1, timeout: float = 30) -> Iterator[str]:
+    """Run `uvicorn app_path` on a free local port until the block exits; yields the base URL."""
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", app_path, "--port", str(port),
+                                "--workers", str(workers), "--log-level", "warning"])
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"uvicorn did not listen on port {port} within {timeout}s")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=timeout)
+
+
+def add_load_arguments(parser: argparse.ArgumentParser, baseline: Path) -> None:
+    parser.add_argument("--mode", choices=MODES, default="inprocess")
+    parser.add_argument("--url", help="Base URL of a running server (--mode url)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per scenario")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (--mode uvicorn)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    add_baseline_arguments(parser, baseline)
+
+
+def add_baseline_arguments(parser: argparse.ArgumentParser, baseline: Path) -> None:
+    parser.add_argument("--baseline", type=Path, default=baseline, help="Stored results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed relative slowdown before flagging a regression")
+
+
+def run_suite(scenarios: Sequence[Scenario], args: argparse.Namespace, app_path: str) -> Dict[str, Dict]:
+    """Run every scenario in args.mode and return results keyed by '<mode> c=<n> <scenario>'."""
+    prefix = f"{args.mode} c={args.concurrency}"
+
+    async def drive(client_context) -> Dict[str, Dict]:
+        results = {}
+        async with client_context as client:
+            for scenario in scenarios:
+                await run_load(client, scenario, args.warmup, args.concurrency)
+                results[f"{prefix} {scenario.name}"] = await run_load(client, scenario, args.requests,
+                                                                      args.concurrency)
+        return results
+
+    def http_client(url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=url, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=args.concurrency))
+
+    if args.mode == "inprocess":
+        results = asyncio.run(drive(asgi_client(import_app(app_path), args.timeout)))
+        rss = peak_rss_mb()
+    elif args.mode == "uvicorn":
+        with uvicorn_server(app_path, args.workers) as url:
+            results = asyncio.run(drive(http_client(url)))
+        rss = peak_rss_mb(children=True)  # the server has exited, so its peak is known
+    else:
+        if not args.url:
+            raise SystemExit("--mode url needs --url")
+        results = asyncio.run(drive(http_client(args.url)))
+        rss = None
+    if rss is not None:
+        results[f"{prefix} peak RSS"] = {"peak_rss_mb": rss}
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Describe every metric that is worse than its baseline by more than tolerance.
+
+    Tail percentiles are skipped unless both results cover MIN_TAIL_REQUESTS requests.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name, {})
+        if "throughput" in current and "throughput" in previous:
+            if current["throughput"] < previous["throughput"] * (1 - tolerance):
+                regressions.append(f"{name}: throughput {current['throughput']:,.1f}/s "
+                                   f"vs baseline {previous['throughput']:,.1f}/s")
+        tail = min(current.get("requests", 0), previous.get("requests", 0)) >= MIN_TAIL_REQUESTS
+        for key in LOWER_IS_BETTER:
+            if key in TAIL_PERCENTILES and not tail:
+                continue
+            if key in current and key in previous and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current[key]:,.3f} vs baseline {previous[key]:,.3f}")
+    return regressions
+
+
+def _cell(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def report(results: Dict[str, Dict], args: argparse.Namespace) -> int:
+    """Print results, compare them with the baseline (or save them); return the exit status."""
+    width = max(len(name) for name in results)
+    print(f"{'scenario':<{width}} {'ops/s':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'MB/s':>8} {'RSS MB':>8} {'errors':>6}")
+    for name, row in results.items():
+        print(f"{name:<{width}} {_cell(row.get('throughput'), ',.1f'):>11} {_cell(row.get('p50_ms'), '.3f'):>9} "
+              f"{_cell(row.get('p95_ms'), '.3f'):>9} {_cell(row.get('p99_ms'), '.3f'):>9} "
+              f"{_cell(row.get('mb_per_s'), ',.1f'):>8} {_cell(row.get('peak_rss_mb'), ',.0f'):>8} "
+              f"{_cell(row.get('errors'), 'd'):>6}")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.save_baseline:
+        baseline.update({name: {key: round(value, 4) for key, value in row.items()}
+                         for name, row in results.items()})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nsaved baseline to {args.baseline}")
+        return 0
+    compared = [name for name in results if name in baseline]
+    if not compared:
+        print(f"\nno baseline entries for these scenarios in {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    errors = [f"{name}: {row['errors']} failed requests" for name, row in results.items() if row.get("errors")]
+    for line in regressions + errors:
+        print(f"REGRESSION {line}")
+    if not regressions and not errors:
+        print(f"\n{len(compared)} results within {args.tolerance:.0%} of {args.baseline}")
+    return 1 if regressions or errors else 0
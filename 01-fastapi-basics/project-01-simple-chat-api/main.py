@@ -1,24 +1,182 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+import json
+import os
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, Optional
+
+from backends import EchoBackend
+from memory import ConversationMemory
+from metrics import instrument
+from scheduler import BatchScheduler, QueueFullError, SchedulerStoppedError
 
 app = FastAPI(title="Simple Chat API")
+instrument(app)
+
+# Generation backend and micro-batching settings
+scheduler = BatchScheduler(
+    EchoBackend(step_delay=float(os.getenv("CHAT_STEP_DELAY_MS", "0")) / 1000),
+    max_batch_size=int(os.getenv("CHAT_MAX_BATCH_SIZE", "8")),
+    max_wait=float(os.getenv("CHAT_MAX_WAIT_MS", "10")) / 1000,
+    max_queue_depth=int(os.getenv("CHAT_MAX_QUEUE_DEPTH", "256")),
+)
+
+# Server-side conversation history, so clients only send the new message
+memory = ConversationMemory(
+    token_budget=int(os.getenv("CHAT_SESSION_TOKEN_BUDGET", "2048")),
+    max_bytes=int(os.getenv("CHAT_MEMORY_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+MEMORY_SNAPSHOT = os.getenv("CHAT_MEMORY_SNAPSHOT", "")
 
 # Define the request model
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None
 
 # Define the response model
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
+
+# WebSocket close codes: unsupported data (binary frames) and service restart
+WS_UNSUPPORTED_DATA = 1003
+WS_SERVICE_RESTART = 1012
+
+def queue_full_error(e: QueueFullError) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+def scheduler_stopped_error(e: SchedulerStoppedError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def start_generation(request: ChatRequest) -> AsyncIterator[str]:
+    """Queue a reply (raises QueueFullError) to the message after the session's history."""
+    history = memory.history(request.session_id) if request.session_id else []
+    return scheduler.submit(scheduler.backend.format_prompt(history, request.message))
+
+def remember_reply(request: ChatRequest, reply: str) -> None:
+    """Record the exchange once the reply is complete, so a failed stream leaves no turn."""
+    if request.session_id:
+        memory.append(request.session_id, "user", request.message)
+        memory.append(request.session_id, "assistant", reply)
+
+@app.on_event("startup")
+async def startup():
+    if MEMORY_SNAPSHOT:
+        memory.load(MEMORY_SNAPSHOT)
+    scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scheduler.stop()
+    if MEMORY_SNAPSHOT:
+        memory.save(MEMORY_SNAPSHOT)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Simple Chat API. Use POST /chat to send a message."}
 
-@app.post("/chat", response_model=ChatResponse)
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def chat(request: ChatRequest):
-    # Basic text processing: echo the message with a prefix
-    processed_response = f"You said: {request.message}"
-    # Alternative example: reverse the message
-    # processed_response = request.message[::-1]
-    return {"response": processed_response}
\ No newline at end of file
+    # The backend echoes the message with a prefix, one token at a time
+    try:
+        tokens = start_generation(request)
+    except QueueFullError as e:
+        raise queue_full_error(e)
+    try:
+        reply = "".join([token async for token in tokens])
+    except SchedulerStoppedError as e:
+        raise scheduler_stopped_error(e)
+    remember_reply(request, reply)
+    return {"response": reply, "session_id": request.session_id}
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Stream the response as Server-Sent Events, one `data:` event per token.
+
+    If the server shuts down mid-reply, the stream ends with an `error` event.
+    """
+    try:
+        tokens = start_generation(request)
+    except QueueFullError as e:
+        raise queue_full_error(e)
+
+    async def events():
+        reply = []
+        try:
+            async for token in tokens:
+                reply.append(token)
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except SchedulerStoppedError as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        remember_reply(request, "".join(reply))
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/chat/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = memory.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {
+        "session_id": session_id,
+        "tokens": session.total_tokens,
+        "turns": [{"role": role, "content": text} for role, text in session.turns()],
+    }
+
+@app.delete("/chat/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not memory.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"deleted": session_id}
+
+async def receive_chat_request(websocket: WebSocket) -> Optional[ChatRequest]:
+    """Read the next frame as a ChatRequest; reply with an error frame and return None if it is invalid."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("text") is None:
+        await websocket.close(code=WS_UNSUPPORTED_DATA, reason="Expected JSON text frames")
+        raise WebSocketDisconnect(WS_UNSUPPORTED_DATA)
+    try:
+        data = json.loads(message["text"])
+        if not isinstance(data, dict):
+            raise TypeError("Expected a JSON object")
+        return ChatRequest(**data)
+    except (json.JSONDecodeError, TypeError, ValidationError) as e:
+        await websocket.send_json({"error": str(e)})
+        return None
+
+@app.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket):
+    """Send {"message": ..., "session_id": ...} frames; replies stream as {"token": ...} frames then {"done": true}.
+
+    Malformed frames get an {"error": ...} frame and the socket stays open;
+    binary frames close it with 1003, and a server shutdown with 1012.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            request = await receive_chat_request(websocket)
+            if request is None:
+                continue
+            try:
+                tokens = start_generation(request)
+            except QueueFullError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            reply = []
+            try:
+                async for token in tokens:
+                    reply.append(token)
+                    await websocket.send_json({"token": token})
+            except SchedulerStoppedError as e:
+                await websocket.close(code=WS_SERVICE_RESTART, reason=str(e))
+                return
+            remember_reply(request, "".join(reply))
+            await websocket.send_json({"done": True})
+    except WebSocketDisconnect:
+        pass
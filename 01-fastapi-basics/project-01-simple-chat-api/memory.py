@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+ROLES = ("user", "assistant")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+# Rough fixed costs counted against the global cap: an empty Session with its
+# containers, and one stored turn (list slot, str header, array entries)
+SESSION_OVERHEAD_BYTES = 320
+TURN_OVERHEAD_BYTES = 64
+
+
+def text_bytes(text: str) -> int:
+    """Bytes a turn's text counts against the global cap: its UTF-8 length."""
+    return len(text.encode("utf-8"))
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count: whitespace-separated words."""
+    return len(text.split())
+
+
+class Session:
+    """One conversation, stored column-wise: texts plus compact role/token arrays."""
+
+    __slots__ = ("texts", "roles", "tokens", "total_tokens", "size")
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.roles = bytearray()
+        self.tokens = array("I")
+        self.total_tokens = 0
+        self.size = SESSION_OVERHEAD_BYTES
+
+    def append(self, role: str, text: str) -> None:
+        tokens = count_tokens(text)
+        self.texts.append(text)
+        self.roles.append(_ROLE_CODES[role])
+        self.tokens.append(tokens)
+        self.total_tokens += tokens
+        self.size += text_bytes(text) + TURN_OVERHEAD_BYTES
+
+    def pop_oldest(self) -> int:
+        """Drop the oldest turn and return how many bytes were freed."""
+        text = self.texts.pop(0)
+        del self.roles[0]
+        self.total_tokens -= self.tokens.pop(0)
+        freed = text_bytes(text) + TURN_OVERHEAD_BYTES
+        self.size -= freed
+        return freed
+
+    def turns(self) -> List[Tuple[str, str]]:
+        return [(ROLES[code], text) for code, text in zip(self.roles, self.texts)]
+
+
+class ConversationMemory:
+    """Session histories bounded per session (token budget) and globally (bytes, LRU)."""
+
+    def __init__(self, token_budget: int = 2048, max_bytes: int = 256 * 1024 * 1024):
+        self.token_budget = token_budget
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def history(self, session_id: str) -> List[Tuple[str, str]]:
+        session = self.get(session_id)
+        return session.turns() if session is not None else []
+
+    def append(self, session_id: str, role: str, text: str) -> None:
+        session = self.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session()
+            self.total_bytes += session.size
+        before = session.size
+        session.append(role, text)
+        # Keep the newest turn even if it alone exceeds the budget
+        while session.total_tokens > self.token_budget and len(session.texts) > 1:
+            session.pop_oldest()
+        self.total_bytes += session.size - before
+        self._evict(keep=session_id)
+
+    def delete(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self.total_bytes -= session.size
+        return True
+
+    def _evict(self, keep: str) -> None:
+        while self.total_bytes > self.max_bytes and len(self._sessions) > 1:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            del self._sessions[session_id]
+            self.total_bytes -= session.size
+
+    def save(self, path: str) -> None:
+        """Write every session to a JSON snapshot, least recently used first."""
+        data = {sid: session.turns() for sid, session in self._sessions.items()}
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        """Restore sessions from a snapshot written by save(), if it exists."""
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for session_id, turns in data.items():
+            for role, text in turns:
+                self.append(session_id, role, text)
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from backends import GenerationBackend
+from metrics import stage_timer
+
+_DONE = object()
+
+
+class QueueFullError(Exception):
+    """Raised when too many requests are already waiting for a batch."""
+
+
+class SchedulerStoppedError(Exception):
+    """Raised to consumers whose request was still pending when the scheduler stopped."""
+
+
+class _Request:
+    __slots__ = ("prompt", "tokens", "cancelled", "state")
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.tokens: asyncio.Queue = asyncio.Queue()
+        self.cancelled = False
+        self.state: Any = None  # backend decoding state, set by prefill
+
+
+class BatchScheduler:
+    """Continuously batches concurrent generation requests for the backend.
+
+    Up to max_batch_size requests decode together. Waiting requests are
+    admitted into free slots between decoding steps, so a new request never
+    waits for the whole batch to finish; only an idle scheduler holds the
+    first request for up to max_wait seconds so others can join it. At most
+    max_queue_depth requests may wait; beyond that submit() fails fast.
+    """
+
+    def __init__(self, backend: GenerationBackend, max_batch_size: int = 8,
+                 max_wait: float = 0.01, max_queue_depth: int = 256):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_depth = max_queue_depth
+        self.batches_run = 0  # groups of requests prefilled together
+        self.steps_run = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._active: List[_Request] = []  # requests being prefilled or decoded
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop batching; every unfinished stream ends with SchedulerStoppedError."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            pending, self._active = self._active, []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for request in pending:
+                request.tokens.put_nowait(SchedulerStoppedError("Server is shutting down"))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, prompt: str) -> AsyncIterator[str]:
+        """Enqueue a prompt and return an iterator over its tokens.
+
+        Raises QueueFullError immediately (before any streaming starts) when
+        the wait queue is full.
+        """
+        self.start()
+        request = _Request(prompt)
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"More than {self.max_queue_depth} requests waiting") from None
+        return self._stream(request)
+
+    async def generate(self, prompt: str) -> str:
+        return "".join([token async for token in self.submit(prompt)])
+
+    async def _stream(self, request: _Request) -> AsyncIterator[str]:
+        try:
+            while (token := await request.tokens.get()) is not _DONE:
+                if isinstance(token, BaseException):
+                    raise token
+                yield token
+        finally:
+            request.cancelled = True
+
+    async def _admit(self) -> None:
+        """Move waiting requests into free batch slots and prefill them."""
+        start = len(self._active)
+        if not self._active:
+            self._active.append(await self._queue.get())
+            deadline = time.monotonic() + self.max_wait
+            while len(self._active) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._active.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        while len(self._active) < self.max_batch_size and not self._queue.empty():
+            self._active.append(self._queue.get_nowait())
+        joining = [request for request in self._active[start:] if not request.cancelled]
+        self._active[start:] = joining
+        if not joining:
+            return
+        self.batches_run += 1
+        try:
+            with stage_timer("prefill"):
+                states = await self.backend.prefill([request.prompt for request in joining])
+        except Exception as e:
+            self._finish(joining, e)
+            return
+        for request, state in zip(joining, states):
+            request.state = state
+
+    async def _step(self) -> None:
+        """Decode one token for every active request and retire the finished ones."""
+        batch = list(self._active)
+        self.steps_run += 1
+        try:
+            with stage_timer("decode_step"):
+                tokens = await self.backend.decode_step([request.state for request in batch])
+        except Exception as e:
+            self._finish(batch, e)
+            return
+        finished = []
+        for request, token in zip(batch, tokens):
+            if token is None or request.cancelled:
+                finished.append(request)
+            else:
+                request.tokens.put_nowait(token)
+        self._finish(finished)
+
+    def _finish(self, requests: List[_Request], error: Optional[Exception] = None) -> None:
+        for request in requests:
+            if error is not None:
+                request.tokens.put_nowait(error)
+            request.tokens.put_nowait(_DONE)
+        done = set(requests)
+        self._active = [request for request in self._active if request not in done]
+
+    async def _run(self) -> None:
+        while True:
+            await self._admit()
+            if self._active:
+                await self._step()
@@ -0,0 +1,211 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from backends import EchoBackend
+from main import app
+from memory import SESSION_OVERHEAD_BYTES, TURN_OVERHEAD_BYTES, ConversationMemory
+from scheduler import BatchScheduler, QueueFullError, SchedulerStoppedError
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def test_chat(client):
+    response = client.post("/chat", json={"message": "Hello,  how are you?"})
+    assert response.status_code == 200
+    assert response.json() == {"response": "You said: Hello,  how are you?"}
+
+
+def test_chat_stream_sse(client):
+    with client.stream("POST", "/chat/stream", json={"message": "stream me please"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = [block for block in body.split("\n\n") if block]
+    tokens = [json.loads(e[len("data: "):])["token"] for e in events if e.startswith("data: ")]
+    assert tokens == ["You ", "said: ", "stream ", "me ", "please"]
+    assert events[-1].startswith("event: done")
+
+
+def test_chat_websocket(client):
+    with client.websocket_connect("/chat/ws") as ws:
+        ws.send_json({"message": "hi there"})
+        frames = []
+        while "done" not in (frame := ws.receive_json()):
+            frames.append(frame["token"])
+    assert "".join(frames) == "You said: hi there"
+
+
+def test_websocket_malformed_frames_keep_socket_open(client):
+    with client.websocket_connect("/chat/ws") as ws:
+        for frame in ("not json", "[1, 2]", '{"session_id": "s"}'):
+            ws.send_text(frame)
+            assert "error" in ws.receive_json()
+        ws.send_json({"message": "still here"})
+        frames = []
+        while "done" not in (frame := ws.receive_json()):
+            frames.append(frame["token"])
+        assert "".join(frames) == "You said: still here"
+        ws.send_bytes(b"\x00")
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == main.WS_UNSUPPORTED_DATA
+
+
+def test_scheduler_stop_maps_to_503_and_close_1012(client, monkeypatch):
+    async def stopped_step(states):
+        raise SchedulerStoppedError("Server is shutting down")
+
+    monkeypatch.setattr(main.scheduler.backend, "decode_step", stopped_step)
+    response = client.post("/chat", json={"message": "hello"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    with client.websocket_connect("/chat/ws") as ws:
+        ws.send_json({"message": "hello"})
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == main.WS_SERVICE_RESTART
+
+
+def test_concurrent_requests_share_batches():
+    async def run():
+        scheduler = BatchScheduler(EchoBackend(), max_batch_size=4, max_wait=0.05)
+        try:
+            replies = await asyncio.gather(*(scheduler.generate(f"msg {i}") for i in range(8)))
+        finally:
+            await scheduler.stop()
+        return scheduler, replies
+
+    scheduler, replies = asyncio.run(run())
+    assert replies == [f"You said: msg {i}" for i in range(8)]
+    assert scheduler.batches_run == 2
+
+
+def test_new_requests_join_between_decode_steps():
+    async def run():
+        scheduler = BatchScheduler(EchoBackend(step_delay=0.005), max_batch_size=4, max_wait=0)
+        try:
+            long_stream = scheduler.submit(" ".join(["word"] * 40))
+            await long_stream.__anext__()  # the long reply is now decoding
+            short = await scheduler.generate("hi")
+            remaining = [token async for token in long_stream]
+        finally:
+            await scheduler.stop()
+        return scheduler, short, remaining
+
+    scheduler, short, remaining = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert short == "You said: hi"
+    assert len(remaining) > 30  # the short reply finished while the long one was still decoding
+    assert scheduler.batches_run == 2
+    assert scheduler.steps_run == 43
+
+
+def test_queue_depth_limit():
+    async def run():
+        scheduler = BatchScheduler(EchoBackend(step_delay=0.01), max_batch_size=1, max_queue_depth=2)
+        try:
+            scheduler.submit("a")
+            scheduler.submit("b")
+            with pytest.raises(QueueFullError):
+                scheduler.submit("c")
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(run())
+
+
+def test_stop_ends_in_flight_and_queued_streams():
+    async def run():
+        scheduler = BatchScheduler(EchoBackend(step_delay=0.01), max_batch_size=1)
+        streams = [scheduler.submit(f"message {i}") for i in range(3)]
+        first = await streams[0].__anext__()  # request 0 is mid-generation, 1 and 2 are queued
+        await scheduler.stop()
+        for stream in streams:
+            with pytest.raises(SchedulerStoppedError):
+                async for _ in stream:
+                    pass
+        return first
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == "You "
+
+
+def test_chat_session_history(client):
+    for message in ("first", "second"):
+        response = client.post("/chat", json={"message": message, "session_id": "s1"})
+        assert response.json()["session_id"] == "s1"
+    session = client.get("/chat/sessions/s1").json()
+    assert [turn["role"] for turn in session["turns"]] == ["user", "assistant"] * 2
+    assert session["turns"][-1]["content"] == "You said: second"
+    assert client.delete("/chat/sessions/s1").status_code == 200
+    assert client.get("/chat/sessions/s1").status_code == 404
+
+
+def test_failed_reply_leaves_no_turn(client, monkeypatch):
+    steps = []
+
+    async def failing_step(states):
+        steps.append(states)
+        if len(steps) > 1:
+            raise RuntimeError("backend failed")
+        return ["partial "] * len(states)
+
+    monkeypatch.setattr(main.scheduler.backend, "decode_step", failing_step)
+    with pytest.raises(RuntimeError):
+        client.post("/chat", json={"message": "hello", "session_id": "broken"})
+    assert client.get("/chat/sessions/broken").status_code == 404
+
+
+def test_session_token_budget_drops_oldest_turns():
+    memory = ConversationMemory(token_budget=5)
+    memory.append("s", "user", "one two three")
+    memory.append("s", "assistant", "four five")
+    memory.append("s", "user", "six seven")
+    session = memory.get("s")
+    assert session.turns() == [("assistant", "four five"), ("user", "six seven")]
+    assert session.total_tokens == 4
+
+
+def test_global_cap_evicts_least_recently_used_sessions():
+    memory = ConversationMemory(max_bytes=3 * (SESSION_OVERHEAD_BYTES + TURN_OVERHEAD_BYTES + 10))
+    for sid in ("a", "b", "c"):
+        memory.append(sid, "user", "x" * 10)
+    memory.get("a")  # touch: "b" is now least recently used
+    memory.append("d", "user", "x" * 10)
+    assert memory.get("b") is None
+    assert memory.get("a") is not None
+    assert memory.total_bytes <= memory.max_bytes
+
+
+def test_session_size_counts_utf8_bytes():
+    memory = ConversationMemory()
+    memory.append("s", "user", "héllo wörld")  # 11 characters, 13 bytes
+    assert memory.total_bytes == SESSION_OVERHEAD_BYTES + TURN_OVERHEAD_BYTES + 13
+
+
+def test_memory_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "memory.json")
+    memory = ConversationMemory()
+    memory.append("s", "user", "hello")
+    memory.append("s", "assistant", "You said: hello")
+    memory.save(path)
+    restored = ConversationMemory()
+    restored.load(path)
+    assert restored.history("s") == memory.history("s")
+    assert restored.total_bytes == memory.total_bytes
+
+
+def test_metrics_endpoint(client):
+    client.post("/chat", json={"message": "measure me"})
+    client.get("/chat/sessions/nobody")
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="POST",route="/chat",status="200"}' in text
+    assert 'route="/chat/sessions/{session_id}",status="404"' in text
+    assert 'app_stage_duration_seconds_count{stage="prefill"}' in text
+    assert 'app_stage_duration_seconds_count{stage="decode_step"}' in text
@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
+import codecs
+from app.metrics import instrument
 from app.models import *
+from app.responses import NDJSON_MEDIA_TYPE, FastJSONResponse
 from app.services import *
 
 app = FastAPI(title="Text Processing API", version="1.0.0")
+instrument(app)
 
 @app.get("/")
 def root():
@@ -14,12 +20,70 @@ def clean_endpoint(input_data: CleanTextInput):
 
 @app.post("/tokenize")
 def tokenize_endpoint(input_data: TokenizeInput):
-    return tokenize(input_data)
+    if input_data.format == "ndjson":
+        return StreamingResponse(iter_token_lines(input_data), media_type=NDJSON_MEDIA_TYPE)
+    return FastJSONResponse(tokenize_result(input_data))
 
 @app.post("/stats")
 def stats_endpoint(input_data: TextInput):
     return calculate_stats(input_data.text)
 
+@app.post("/stats/stream")
+async def stats_stream_endpoint(request: Request, unique: Literal["exact", "approximate"] = "exact"):
+    """Stats for a raw text/plain body read incrementally, so any size fits in memory."""
+    stats = StreamingStats(approximate=unique == "approximate")
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for chunk in request.stream():
+        stats.feed(decoder.decode(chunk))
+    stats.feed(decoder.decode(b"", final=True))
+    return stats.result()
+
+@app.post("/word-frequency")
+def word_frequency_endpoint(input_data: WordFrequencyInput):
+    return word_frequency(input_data)
+
+@app.post("/ngrams")
+def ngrams_endpoint(input_data: NgramInput):
+    return ngrams(input_data)
+
+@app.post("/sentiment")
+def sentiment_endpoint(input_data: TextInput):
+    return analyze_sentiment(input_data)
+
+def check_batch_size(items):
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+
+@app.post("/clean/batch")
+def clean_batch_endpoint(input_data: List[CleanTextInput]):
+    check_batch_size(input_data)
+    return run_batch(clean_result, input_data)
+
+@app.post("/tokenize/batch")
+def tokenize_batch_endpoint(input_data: List[TokenizeInput]):
+    check_batch_size(input_data)
+    if any(item.format == "ndjson" for item in input_data):
+        raise HTTPException(status_code=422, detail='"ndjson" format cannot be batched; use /tokenize')
+    return run_batch(tokenize_result, input_data)
+
+@app.post("/stats/batch")
+def stats_batch_endpoint(input_data: List[TextInput]):
+    check_batch_size(input_data)
+    return run_batch(stats_result, input_data)
+
+@app.post("/sentiment/batch")
+def sentiment_batch_endpoint(input_data: List[TextInput]):
+    check_batch_size(input_data)
+    return run_batch(analyze_sentiment, input_data)
+
+@app.post("/analyze")
+def analyze_endpoint(input_data: AnalyzeInput):
+    return analyze(input_data)
+
+@app.on_event("shutdown")
+def shutdown():
+    shutdown_batch_pool()
+
 @app.get("/health")
 def health():
     return {"status": "healthy"}
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""Dependency-free request and stage metrics in the Prometheus text format.
+
+Each FastAPI service in this track keeps its own copy of this module, as
+they are installed and deployed separately. The HTTP metrics are the same in
+every copy; the stage helpers are trimmed to what the service uses. Call
+instrument(app) once to record:
+
+- http_request_duration_seconds   latency histogram (method, route, status)
+- http_requests_in_flight         gauge (method)
+- http_request_size_bytes         request body histogram (method, route)
+- http_response_size_bytes        response body histogram (method, route)
+
+and to serve everything at GET /metrics. Code paths report internal stages
+to app_stage_duration_seconds with `with stage_timer("name"):` or @timed, and
+capture_stages()/replay_stages() bring back timings from worker processes.
+"""
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(4 ** i * 64 for i in range(12))  # 64 B .. 256 MiB
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric") -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "".join(line + "\n" for metric in self._metrics for line in metric.collect())
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def collect(self) -> Iterator[str]:
+        yield from super().collect()
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum]; cumulated only when rendering
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> Iterator[str]:
+        yield from super().collect()
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        names = self.labelnames + ("le",)
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(total)}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency until the last body byte is sent.",
+                            ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.", ("method",))
+REQUEST_BYTES = Histogram("http_request_size_bytes", "HTTP request body size.", ("method", "route"), SIZE_BUCKETS)
+RESPONSE_BYTES = Histogram("http_response_size_bytes", "HTTP response body size.", ("method", "route"), SIZE_BUCKETS)
+STAGE_SECONDS = Histogram("app_stage_duration_seconds", "Time spent in internal processing stages.", ("stage",))
+
+# Per-thread list that, while set, collects stage timings instead of recording
+# them (see capture_stages); lets worker processes ship timings back
+_capture = threading.local()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    captured = getattr(_capture, "stages", None)
+    if captured is not None:
+        captured.append((stage, seconds))
+    else:
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+class stage_timer:
+    """Context manager timing a block as one observation of a stage."""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "stage_timer":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        record_stage(self.stage, perf_counter() - self.start)
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorator recording each call of a function as the given stage."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class capture_stages:
+    """Collect this thread's stage timings into a list instead of recording them.
+
+    Used around work done in another process: return the list with the
+    result and pass it to replay_stages() in the process serving /metrics.
+    """
+
+    def __enter__(self) -> List[Tuple[str, float]]:
+        self._previous = getattr(_capture, "stages", None)
+        _capture.stages = []
+        return _capture.stages
+
+    def __exit__(self, *exc_info) -> None:
+        _capture.stages = self._previous
+
+
+def replay_stages(stages: List[Tuple[str, float]]) -> None:
+    for stage, seconds in stages:
+        record_stage(stage, seconds)
+
+
+def route_template(scope) -> str:
+    """Path template of the route that handled a request, e.g. /items/{item_id}.
+
+    Call after the app has run: routing stores the matched route in the
+    scope, and its path_format is the template without converters. Routes
+    that don't expose one fall back to putting each path_params value back
+    as its {name}, which only works while values print as they were sent
+    (an int converter turns "007" into 7). Using templates rather than raw
+    paths keeps label cardinality bounded.
+    """
+    if "endpoint" not in scope:
+        return "unmatched"
+    path_format = getattr(scope.get("route"), "path_format", None)
+    if path_format is not None:
+        return path_format
+    segments = scope["path"].split("/")
+    for name, value in (scope.get("path_params") or {}).items():
+        value = str(value)
+        if "/" in value:  # {name:path} parameters span several segments
+            path = "/".join(segments)
+            head, sep, tail = path.rpartition(value)
+            segments = (head + "{" + name + "}" + tail).split("/") if sep else segments
+            continue
+        for index in range(len(segments) - 1, 0, -1):
+            if segments[index] == value:
+                segments[index] = "{" + name + "}"
+                break
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        received = sent = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal sent, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        # The route is only known once the app has routed the request, so
+        # the in-flight gauge is labelled by method alone
+        REQUESTS_IN_FLIGHT.inc(method)
+        start = perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = route_template(scope)
+            REQUEST_SECONDS.observe(perf_counter() - start, method, route, str(status))
+            REQUESTS_IN_FLIGHT.dec(method)
+            REQUEST_BYTES.observe(received, method, route)
+            RESPONSE_BYTES.observe(sent, method, route)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def instrument(app) -> None:
+    """Add MetricsMiddleware to a FastAPI app and serve the registry at /metrics."""
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
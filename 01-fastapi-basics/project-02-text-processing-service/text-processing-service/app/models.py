@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 class TextInput(BaseModel):
     text: str
@@ -10,4 +11,29 @@ class CleanTextInput(BaseModel):
 
 class TokenizeInput(BaseModel):
     text: str
-    method: str = "word"
\ No newline at end of file
+    method: Literal["word", "sentence"] = "word"
+    # "offsets": packed (gap, length) pairs instead of strings; "ndjson": streamed lines
+    format: Literal["tokens", "offsets", "ndjson"] = "tokens"
+    cursor: int = Field(0, ge=0)  # next_cursor of the previous page
+    limit: Optional[int] = Field(None, ge=1)  # tokens per page
+    include_total: bool = False  # also count every token in the text, as "total"
+
+class AnalyzeInput(BaseModel):
+    text: str
+    operations: List[Literal["clean", "tokenize", "stats"]] = ["clean", "tokenize", "stats"]
+    lowercase: bool = True
+    remove_punctuation: bool = True
+    method: Literal["word", "sentence"] = "word"
+
+class WordFrequencyInput(BaseModel):
+    text: str
+    top_k: Optional[int] = Field(None, ge=1)
+    lowercase: bool = True
+    max_tracked: Optional[int] = Field(None, ge=1)  # bound memory on huge inputs
+
+class NgramInput(BaseModel):
+    text: str
+    n: int = Field(2, ge=1, le=10)
+    top_k: int = Field(10, ge=1)
+    lowercase: bool = True
+    max_tracked: Optional[int] = Field(None, ge=1)  # bound memory on huge inputs
@@ -0,0 +1,43 @@
+import base64
+import sys
+from array import array
+from itertools import chain
+from operator import sub
+
+# Packed token offsets use the narrowest of these (array typecode, name, bound)
+OFFSET_DTYPES = (("B", "uint8", 1 << 8), ("H", "uint16", 1 << 16), ("I", "uint32", 1 << 32))
+TYPECODES = {name: code for code, name, _ in OFFSET_DTYPES}
+
+
+def pack_offsets(offsets, cursor=0):
+    """Return (base64 string, dtype name) of the spans as little-endian (gap, length) pairs.
+
+    gap is the distance from the previous token's end (the cursor for the
+    first token) to this token's start. Deltas mostly fit in one byte,
+    where absolute offsets would take more space than the tokens themselves.
+    """
+    starts, ends = offsets[0::2], offsets[1::2]
+    gaps = map(sub, starts, chain((cursor,), ends))
+    deltas = array("I", chain.from_iterable(zip(gaps, map(sub, ends, starts))))
+    peak = max(deltas, default=0)
+    typecode, dtype = next((code, name) for code, name, bound in OFFSET_DTYPES if peak < bound)
+    packed = array(typecode, deltas)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed).decode("ascii"), dtype
+
+
+def decode_offsets(packed, dtype, cursor=0):
+    """Iterate over the (start, end) spans of pack_offsets() output.
+
+    cursor must be the one the page was requested with. Only the standard
+    library is used, so clients such as app_ui.py can import this as is.
+    """
+    deltas = array(TYPECODES[dtype], base64.b64decode(packed))
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    end = cursor
+    for gap, length in zip(deltas[0::2], deltas[1::2]):
+        start = end + gap
+        end = start + length
+        yield start, end
@@ -0,0 +1,28 @@
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: several times faster, same output
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def dumps(content) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by dumps().
+
+    Endpoints return it directly, which also skips FastAPI's jsonable_encoder
+    pass over every element - most of the cost for large token lists.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,113 @@
+import os
+import re
+from pathlib import Path
+
+LEXICON_PATH = Path(os.getenv("SENTIMENT_LEXICON", str(Path(__file__).parent / "data" / "sentiment_lexicon.tsv")))
+
+# Words, contractions ("don't") and clause-ending punctuation, which stops negation
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)?|[.!?;:,]")
+# Curly quotes used as apostrophes ("don\u2019t") are read as "'"
+APOSTROPHES = str.maketrans({"\u2018": "'", "\u2019": "'"})
+CLAUSE_BREAKS = frozenset(".!?;:,")
+NEGATORS = frozenset({"not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "cannot", "without", "hardly"})
+NEGATION_WINDOW = 3  # a negator flips sentiment terms up to this many words later
+NEGATION_FACTOR = -0.75
+NEUTRAL_THRESHOLD = 0.05
+
+
+def tokenize(text):
+    """Lowercase text and split it into words, contractions and clause breaks."""
+    return TOKEN_PATTERN.findall(text.lower().translate(APOSTROPHES))
+
+
+class SentimentLexicon:
+    """Term and phrase scores stored as a token trie for one-pass longest-match lookup.
+
+    Each trie node is a two-item list: [score or None, {next token: child node}].
+    """
+
+    def __init__(self, entries):
+        self._root = {}
+        self.size = 0
+        for term, score in entries:
+            tokens = tokenize(term)
+            if not tokens:
+                continue
+            node = self._root.setdefault(tokens[0], [None, {}])
+            for token in tokens[1:]:
+                node = node[1].setdefault(token, [None, {}])
+            node[0] = float(score)
+            self.size += 1
+
+    @classmethod
+    def load(cls, path=LEXICON_PATH):
+        """Read a local `term<TAB>score` file; lines starting with # are comments."""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    term, score = line.rsplit("\t", 1)
+                    entries.append((term, score))
+        return cls(entries)
+
+    def match(self, tokens, start):
+        """Return (score, length) of the longest entry starting at tokens[start], or (None, 1)."""
+        node = self._root.get(tokens[start])
+        best_score, best_length = None, 1
+        i = start + 1
+        while node is not None:
+            if node[0] is not None:
+                best_score, best_length = node[0], i - start
+            if i == len(tokens):
+                break
+            node = node[1].get(tokens[i])
+            i += 1
+        return best_score, best_length
+
+    def score(self, text):
+        tokens = tokenize(text)
+        total = magnitude = 0.0
+        positive = negative = 0
+        since_negator = NEGATION_WINDOW + 1
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in CLAUSE_BREAKS:
+                since_negator = NEGATION_WINDOW + 1
+                i += 1
+                continue
+            value, length = self.match(tokens, i)
+            if value is None:
+                if token in NEGATORS or token.endswith("n't"):
+                    since_negator = 0
+                else:
+                    since_negator += 1
+                i += 1
+                continue
+            if since_negator < NEGATION_WINDOW:
+                value *= NEGATION_FACTOR
+            total += value
+            magnitude += abs(value)
+            if value > 0:
+                positive += 1
+            else:
+                negative += 1
+            since_negator += length
+            i += length
+
+        score = total / magnitude if magnitude else 0.0
+        if score > NEUTRAL_THRESHOLD:
+            sentiment = "positive"
+        elif score < -NEUTRAL_THRESHOLD:
+            sentiment = "negative"
+        else:
+            sentiment = "neutral"
+        return {
+            "sentiment": sentiment,
+            "score": round(score, 4),
+            "positive_words": positive,
+            "negative_words": negative
+        }
+
+lexicon = SentimentLexicon.load()
@@ -1,25 +1,340 @@
+import heapq
+import os
 import re
-from collections import Counter
+import threading
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from operator import itemgetter
 
+from app.metrics import capture_stages, replay_stages, stage_timer, timed
+from app.offsets import pack_offsets
+from app.responses import dumps
+from app.sentiment import lexicon
+from app.sketches import HyperLogLog, SpaceSaving
+
+# Compiled once at import; every service function shares these
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+WORD_PATTERN = re.compile(r'\b\w+\b')
+SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]+')
+WORD_PREFIX_PATTERN = re.compile(r'\w*')
+# StreamingStats keeps at most this much of a word split across pieces; longer
+# runs of word characters still count once, compared by this prefix
+MAX_WORD_CHARS = 1024
+
+# Batches at least this large are spread over a process pool
+BATCH_PARALLEL_THRESHOLD = int(os.getenv("BATCH_PARALLEL_THRESHOLD", "5000"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100000"))
+
+# Tokens per chunk written by the NDJSON tokenize stream
+NDJSON_CHUNK_TOKENS = 1000
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+@timed("clean_text")
 def clean_text(input_data):
     text = input_data.text
     if input_data.lowercase:
         text = text.lower()
     if input_data.remove_punctuation:
-        text = re.sub(r'[^\w\s]', ' ', text)
-    return re.sub(r'\s+', ' ', text).strip()
+        text = PUNCTUATION_PATTERN.sub(' ', text)
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
 
+@timed("tokenize")
 def tokenize(input_data):
     if input_data.method == "word":
-        tokens = re.findall(r'\b\w+\b', input_data.text)
+        tokens = WORD_PATTERN.findall(input_data.text)
     elif input_data.method == "sentence":
-        tokens = re.split(r'[.!?]+', input_data.text)
+        tokens = SENTENCE_SPLIT_PATTERN.split(input_data.text)
     return {"tokens": tokens, "count": len(tokens)}
 
-def calculate_stats(text):
-    words = re.findall(r'\b\w+\b', text)
+def count_tokens(text, method):
+    """Number of tokens tokenize() returns for text, without building them."""
+    if method == "word":
+        return sum(1 for _ in WORD_PATTERN.finditer(text))
+    if method == "sentence":
+        return sum(1 for _ in SENTENCE_SPLIT_PATTERN.finditer(text)) + 1
+    raise ValueError(f"Unknown tokenization method: {method}")
+
+def iter_token_spans(text, method, cursor=0):
+    """Iterate over (start, end) of the tokens tokenize() returns, from offset cursor on."""
+    if method == "word":
+        return map(re.Match.span, WORD_PATTERN.finditer(text, cursor))
+    if method == "sentence":
+        return _sentence_spans(text, cursor)
+    raise ValueError(f"Unknown tokenization method: {method}")
+
+def _sentence_spans(text, cursor):
+    start = cursor
+    for match in SENTENCE_SPLIT_PATTERN.finditer(text, cursor):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
+
+def page_spans(text, method, cursor=0, limit=None):
+    """Return ([start, end, start, end, ...], next_cursor) for up to limit tokens from cursor.
+
+    next_cursor is the start of the first token left out, or None on the last page.
+    """
+    spans = iter_token_spans(text, method, cursor)
+    if limit is not None:
+        spans = islice(spans, limit + 1)
+    offsets = array("I", chain.from_iterable(spans))
+    next_cursor = None
+    if limit is not None and len(offsets) > 2 * limit:
+        next_cursor = offsets[2 * limit]
+        del offsets[2 * limit:]
+    return offsets, next_cursor
+
+@timed("tokenize_page")
+def tokenize_page(input_data):
+    """One page (cursor, limit) of tokens, as strings or packed offsets, with the next cursor."""
+    text = input_data.text
+    cursor = min(input_data.cursor, len(text))
+    offsets, next_cursor = page_spans(text, input_data.method, cursor, input_data.limit)
+    if input_data.format == "offsets":
+        packed, dtype = pack_offsets(offsets, cursor)
+        result = {"offsets": packed, "dtype": dtype}
+    else:
+        result = {"tokens": list(map(text.__getitem__, map(slice, offsets[0::2], offsets[1::2])))}
+    result["count"] = len(offsets) // 2
+    result["next_cursor"] = next_cursor
+    if input_data.include_total:
+        result["total"] = count_tokens(text, input_data.method)
+    return result
+
+def tokenize_result(input_data):
+    """tokenize() or tokenize_page(), whichever the format, cursor, limit and include_total ask for."""
+    if (input_data.format == "tokens" and input_data.cursor == 0 and input_data.limit is None
+            and not input_data.include_total):
+        return tokenize(input_data)
+    return tokenize_page(input_data)
+
+def iter_token_lines(input_data):
+    """NDJSON for one page of tokens, NDJSON_CHUNK_TOKENS lines per chunk.
+
+    Each token is a {"token", "start", "end"} line, and a final
+    {"count", "next_cursor"} line (plus "total" if asked for) closes the page.
+    """
+    text = input_data.text
+    spans = iter_token_spans(text, input_data.method, min(input_data.cursor, len(text)))
+    limit = input_data.limit
+    if limit is not None:
+        spans = islice(spans, limit + 1)
+    count, next_cursor, lines = 0, None, []
+    for start, end in spans:
+        if count == limit:  # the extra token only shows there is another page
+            next_cursor = start
+            break
+        lines.append(dumps({"token": text[start:end], "start": start, "end": end}))
+        count += 1
+        if len(lines) == NDJSON_CHUNK_TOKENS:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    summary = {"count": count, "next_cursor": next_cursor}
+    if input_data.include_total:
+        summary["total"] = count_tokens(text, input_data.method)
+    lines.append(dumps(summary))
+    yield b"\n".join(lines) + b"\n"
+
+def stats_from_words(text, words):
     return {
         "character_count": len(text),
         "word_count": len(words),
         "unique_words": len(set(words))
-    }
\ No newline at end of file
+    }
+
+@timed("calculate_stats")
+def calculate_stats(text):
+    return stats_from_words(text, WORD_PATTERN.findall(text))
+
+class StreamingStats:
+    """Incremental calculate_stats over text arriving in arbitrary pieces.
+
+    A word cut off at the end of one piece is carried over and completed by
+    the next. With approximate=True, unique_words comes from a HyperLogLog
+    sketch, so memory stays constant however many distinct words there are.
+    """
+
+    def __init__(self, approximate=False):
+        self.character_count = 0
+        self.word_count = 0
+        self._unique = HyperLogLog() if approximate else set()
+        self._carry = []  # pieces of the partial word, at most MAX_WORD_CHARS in total
+        self._carry_chars = 0
+
+    def feed(self, piece):
+        self.character_count += len(piece)
+        # Word characters at the start continue the carried partial word; each
+        # piece is scanned once, however long that word grows
+        head = WORD_PREFIX_PATTERN.match(piece).end()
+        self._extend_carry(piece[:head])
+        if head == len(piece):
+            return
+        if self._carry:
+            self._count_words([self._take_carry()])
+        # Hold back a trailing partial word (\w is alphanumeric or underscore)
+        cut = len(piece)
+        while cut > head and (piece[cut - 1].isalnum() or piece[cut - 1] == '_'):
+            cut -= 1
+        self._count_words(WORD_PATTERN.findall(piece, head, cut))
+        self._extend_carry(piece[cut:])
+
+    def result(self):
+        if self._carry:
+            self._count_words([self._take_carry()])
+        unique = self._unique.count() if isinstance(self._unique, HyperLogLog) else len(self._unique)
+        return {
+            "character_count": self.character_count,
+            "word_count": self.word_count,
+            "unique_words": unique
+        }
+
+    def _extend_carry(self, text):
+        text = text[:MAX_WORD_CHARS - self._carry_chars]
+        if text:
+            self._carry.append(text)
+            self._carry_chars += len(text)
+
+    def _take_carry(self):
+        word = ''.join(self._carry)
+        self._carry, self._carry_chars = [], 0
+        return word
+
+    def _count_words(self, words):
+        self.word_count += len(words)
+        self._unique.update(words if isinstance(self._unique, set) else set(words))
+
+def iter_ngrams(text, n, lowercase=True):
+    """Yield space-joined n-grams of words with a sliding window, one at a time."""
+    window = deque(maxlen=n)
+    for match in WORD_PATTERN.finditer(text):
+        word = match.group()
+        window.append(word.lower() if lowercase else word)
+        if len(window) == n:
+            yield ' '.join(window)
+
+def count_ngrams(text, n, top_k=None, lowercase=True, max_tracked=None):
+    """Return (total, unique, [(ngram, frequency), ...] most frequent first).
+
+    With max_tracked set, counting uses a SpaceSaving summary and unique is a
+    HyperLogLog estimate, so memory is bounded however large the text is.
+    """
+    ngrams = iter_ngrams(text, n, lowercase)
+    if max_tracked is None:
+        counts = Counter(ngrams)
+        total, unique = sum(counts.values()), len(counts)
+    else:
+        counts, distinct, total = SpaceSaving(max_tracked), HyperLogLog(), 0
+        for ngram in ngrams:
+            total += 1
+            counts.add(ngram)
+            distinct.add(ngram)
+        unique = distinct.count()
+    if top_k is None:
+        ranked = sorted(counts.items(), key=itemgetter(1), reverse=True)
+    else:
+        ranked = heapq.nlargest(top_k, counts.items(), key=itemgetter(1))
+    return total, unique, ranked
+
+@timed("word_frequency")
+def word_frequency(input_data):
+    total, unique, ranked = count_ngrams(input_data.text, 1, input_data.top_k,
+                                         input_data.lowercase, input_data.max_tracked)
+    return {
+        "total_words": total,
+        "unique_words": unique,
+        "word_frequencies": [{"word": word, "frequency": freq} for word, freq in ranked]
+    }
+
+@timed("ngrams")
+def ngrams(input_data):
+    total, unique, ranked = count_ngrams(input_data.text, input_data.n, input_data.top_k,
+                                         input_data.lowercase, input_data.max_tracked)
+    return {
+        "n": input_data.n,
+        "total_ngrams": total,
+        "unique_ngrams": unique,
+        "ngrams": [{"ngram": ngram, "frequency": freq} for ngram, freq in ranked]
+    }
+
+@timed("analyze")
+def analyze(input_data):
+    """Run the requested operations sharing a single word tokenization of the text."""
+    text = input_data.text
+    operations = set(input_data.operations)
+    needs_words = (
+        "stats" in operations
+        or ("tokenize" in operations and input_data.method == "word")
+        or ("clean" in operations and input_data.remove_punctuation)
+    )
+    words = WORD_PATTERN.findall(text) if needs_words else None
+
+    result = {}
+    if "clean" in operations:
+        if input_data.remove_punctuation:
+            # Stripping punctuation and collapsing whitespace leaves exactly the words
+            cleaned = ' '.join(words)
+            result["cleaned_text"] = cleaned.lower() if input_data.lowercase else cleaned
+        else:
+            result["cleaned_text"] = clean_text(input_data)
+    if "tokenize" in operations:
+        result["tokenize"] = {"tokens": words, "count": len(words)} if input_data.method == "word" else tokenize(input_data)
+    if "stats" in operations:
+        result["stats"] = stats_from_words(text, words)
+    return result
+
+@timed("analyze_sentiment")
+def analyze_sentiment(input_data):
+    return lexicon.score(input_data.text)
+
+def clean_result(input_data):
+    return {"cleaned_text": clean_text(input_data)}
+
+def stats_result(input_data):
+    return calculate_stats(input_data.text)
+
+def run_batch(func, items):
+    """Apply func to every item, in order, fanning large batches out to worker processes."""
+    with stage_timer(f"{func.__name__}_batch"):
+        if len(items) < BATCH_PARALLEL_THRESHOLD or BATCH_WORKERS < 2:
+            return [func(item) for item in items]
+        # A few chunks per worker keeps pickling overhead low and load balanced
+        chunksize = max(1, len(items) // (BATCH_WORKERS * 4))
+        chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+        results = []
+        # Workers have their own metrics registry, so bring their stage timings back
+        for chunk_results, stages in get_batch_pool().map(partial(_apply_capturing_stages, func), chunks):
+            results.extend(chunk_results)
+            replay_stages(stages)
+        return results
+
+def _apply_capturing_stages(func, chunk):
+    """Runs in a worker process: func applied to each item, with the stage timings it recorded."""
+    with capture_stages() as stages:
+        results = [func(item) for item in chunk]
+    return results, stages
+
+def get_batch_pool():
+    """Return the shared worker pool, creating it on first use.
+
+    Batch endpoints run in FastAPI's threadpool, so two first batches can
+    arrive together; the lock makes sure only one pool is ever started.
+    """
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        return _batch_pool
+
+def shutdown_batch_pool():
+    global _batch_pool
+    with _batch_pool_lock:
+        pool, _batch_pool = _batch_pool, None
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,81 @@
+import heapq
+import math
+from hashlib import blake2b
+
+def hash64(item):
+    """Stable 64-bit hash of a string (Python's hash() is salted per process)."""
+    return int.from_bytes(blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HyperLogLog:
+    """Distinct-count estimator using 2**precision one-byte registers.
+
+    The default precision (14) uses 16 KB and has a standard error of about 0.8%.
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._value_bits = 64 - precision
+        self._value_mask = (1 << self._value_bits) - 1
+
+    def add(self, item):
+        x = hash64(item)
+        index = x >> self._value_bits
+        rank = self._value_bits - (x & self._value_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting is more accurate here
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+class SpaceSaving:
+    """Approximate top-k counter that tracks at most `capacity` distinct items.
+
+    When full, a new item replaces the current minimum and inherits its count
+    (Metwally et al.), so counts can only be overestimated, and any item
+    occurring more than total/capacity times is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts = {}
+        # One (count, item) entry per tracked item; counts may lag behind self.counts
+        self._heap = []
+
+    def add(self, item):
+        counts = self.counts
+        if item in counts:
+            counts[item] += 1
+            return
+        if len(counts) < self.capacity:
+            counts[item] = 1
+            heapq.heappush(self._heap, (1, item))
+            return
+        # Find the true minimum, refreshing stale heap entries on the way
+        while True:
+            count, victim = self._heap[0]
+            if counts[victim] == count:
+                break
+            heapq.heapreplace(self._heap, (counts[victim], victim))
+        del counts[victim]
+        counts[item] = count + 1
+        heapq.heapreplace(self._heap, (count + 1, item))
+
+    def items(self):
+        return self.counts.items()
@@ -5,8 +5,11 @@ from collections import Counter
 import plotly.express as px
 import plotly.graph_objects as go
 
+from app.offsets import decode_offsets
+
 # API Configuration
 API_URL = "http://localhost:8000"
+TOKENS_SHOWN = 50  # tokens fetched per page
 
 # Page Config
 st.set_page_config(
@@ -100,24 +103,32 @@ if st.button("🚀 Process Text", type="primary", use_container_width=True):
                 
                 # Tokenization
                 elif operation == "Tokenization":
-                    method = st.radio("Tokenization Method:", ["word", "sentence", "char"], horizontal=True)
+                    method = st.radio("Tokenization Method:", ["word", "sentence"], horizontal=True)
                     lowercase_tok = st.checkbox("Lowercase tokens", value=False)
                     
+                    # Only the first page is fetched, as packed offsets; "total" counts the rest
                     response = requests.post(f"{API_URL}/tokenize", json={
                         "text": input_text,
                         "method": method,
-                        "lowercase": lowercase_tok
+                        "format": "offsets",
+                        "cursor": 0,
+                        "limit": TOKENS_SHOWN,
+                        "include_total": True
                     })
                     
                     if response.status_code == 200:
                         result = response.json()
+                        spans = decode_offsets(result["offsets"], result["dtype"])
+                        tokens = [input_text[start:end] for start, end in spans]
+                        if lowercase_tok:
+                            tokens = [token.lower() for token in tokens]
                         with result_container:
-                            st.success(f"✅ Found {result['count']} tokens!")
-                            st.metric("Token Count", result['count'])
+                            st.success(f"✅ Found {result['total']} tokens!")
+                            st.metric("Token Count", result['total'])
                             st.write("**Tokens:**")
-                            st.json(result['tokens'][:50])  # Show first 50
-                            if len(result['tokens']) > 50:
-                                st.info(f"Showing first 50 of {len(result['tokens'])} tokens")
+                            st.json(tokens)
+                            if result['next_cursor'] is not None:
+                                st.info(f"Showing first {result['count']} of {result['total']} tokens")
                 
                 # Text Statistics
                 elif operation == "Text Statistics":
@@ -0,0 +1,59 @@
+"""Compare texts/second for the single-item and batch endpoints.
+
+Runs the app in-process, so the numbers measure FastAPI/pydantic overhead
+plus the regex work, without network latency:
+
+    python -m benchmarks.batch_throughput --texts 20000 --batch-size 1000
+"""
+import argparse
+import random
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+WORDS = "the printer is broken again and support has not replied to my ticket yet please help".split()
+
+
+def make_texts(count, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 25))) + "!" for _ in range(count)]
+
+
+def time_single(client, endpoint, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        client.post(endpoint, json=payload).raise_for_status()
+    return time.perf_counter() - start
+
+
+def time_batch(client, endpoint, payloads, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(payloads), batch_size):
+        client.post(f"{endpoint}/batch", json=payloads[i:i + batch_size]).raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    payloads = {
+        "/clean": [{"text": t} for t in texts],
+        "/tokenize": [{"text": t} for t in texts],
+        "/stats": [{"text": t} for t in texts],
+    }
+    with TestClient(app) as client:
+        print(f"{'endpoint':<10} {'single texts/s':>15} {'batch texts/s':>15} {'speedup':>8}")
+        for endpoint, items in payloads.items():
+            single = time_single(client, endpoint, items)
+            batch = time_batch(client, endpoint, items, args.batch_size)
+            print(f"{endpoint:<10} {len(items) / single:>15,.0f} {len(items) / batch:>15,.0f} {single / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
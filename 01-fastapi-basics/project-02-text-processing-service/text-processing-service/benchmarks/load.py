@@ -0,0 +1,43 @@
+"""Requests/second and latency percentiles of the text endpoints under concurrent load.
+
+Each scenario posts synthetic texts of a given word count. Runs in-process
+by default, or against a local uvicorn or any running server:
+
+    python -m benchmarks.load --sizes 20 2000 --concurrency 8
+    python -m benchmarks.load --mode uvicorn --workers 2 --concurrency 32
+    python -m benchmarks.load --save-baseline    # accept the current numbers
+
+Exits with status 1 when a result regresses against benchmarks/baselines/load.json.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.loadgen import Scenario, add_load_arguments, report, run_suite, synthetic_text
+
+ENDPOINTS = ("/clean", "/tokenize", "/stats", "/analyze", "/sentiment")
+# Distinct texts per scenario, sent round-robin
+TEXTS_PER_SCENARIO = 16
+
+
+def build_scenarios(sizes):
+    scenarios = []
+    for words in sizes:
+        texts = [synthetic_text(words, seed) for seed in range(TEXTS_PER_SCENARIO)]
+        for endpoint in ENDPOINTS:
+            requests = [{"method": "POST", "url": endpoint, "json": {"text": text}} for text in texts]
+            scenarios.append(Scenario(f"POST {endpoint} {words}w", requests))
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 2000], help="Words per text")
+    add_load_arguments(parser, Path(__file__).parent / "baselines" / "load.json")
+    args = parser.parse_args()
+    results = run_suite(build_scenarios(args.sizes), args, "app.main:app")
+    sys.exit(report(results, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Calls/second and MB/s of the text service functions across input sizes.
+
+Calls the functions directly, without HTTP or validation, on synthetic
+texts of each word count:
+
+    python -m benchmarks.micro --sizes 10 1000 100000
+    python -m benchmarks.micro --save-baseline
+
+Exits with status 1 when a result regresses against benchmarks/baselines/micro.json.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from app.models import CleanTextInput, TokenizeInput
+from app.services import calculate_stats, clean_text, tokenize
+from benchmarks.loadgen import add_baseline_arguments, measure, report, synthetic_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="Words per text")
+    parser.add_argument("--rounds", type=int, default=20)
+    add_baseline_arguments(parser, Path(__file__).parent / "baselines" / "micro.json")
+    args = parser.parse_args()
+
+    results = {}
+    for words in args.sizes:
+        text = synthetic_text(words)
+        size = len(text.encode("utf-8"))
+        cases = {
+            "clean_text": (clean_text, CleanTextInput(text=text)),
+            "tokenize word": (tokenize, TokenizeInput(text=text)),
+            "tokenize sentence": (tokenize, TokenizeInput(text=text, method="sentence")),
+            "calculate_stats": (calculate_stats, text),
+        }
+        for name, (func, argument) in cases.items():
+            results[f"{name} {words}w"] = measure(func, argument, rounds=args.rounds, bytes_per_call=size)
+    sys.exit(report(results, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import base64
+import json
+from array import array
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import services
+from app.main import app
+from app.offsets import decode_offsets, pack_offsets
+
+client = TestClient(app)
+
+SAMPLE = "Hello WORLD!!! This is a test.  Hello again, world? Under_score & co."
+
+
+def test_analyze_matches_individual_endpoints():
+    response = client.post("/analyze", json={"text": SAMPLE})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["cleaned_text"] == client.post("/clean", json={"text": SAMPLE}).json()["cleaned_text"]
+    assert result["tokenize"] == client.post("/tokenize", json={"text": SAMPLE}).json()
+    assert result["stats"] == client.post("/stats", json={"text": SAMPLE}).json()
+
+
+@pytest.mark.parametrize("lowercase", [True, False])
+@pytest.mark.parametrize("remove_punctuation", [True, False])
+def test_analyze_clean_options(lowercase, remove_punctuation):
+    options = {"lowercase": lowercase, "remove_punctuation": remove_punctuation}
+    analyzed = client.post("/analyze", json={"text": SAMPLE, "operations": ["clean"], **options}).json()
+    cleaned = client.post("/clean", json={"text": SAMPLE, **options}).json()
+    assert analyzed == {"cleaned_text": cleaned["cleaned_text"]}
+
+
+def test_analyze_sentence_tokenize_only():
+    payload = {"text": SAMPLE, "operations": ["tokenize"], "method": "sentence"}
+    analyzed = client.post("/analyze", json=payload).json()
+    assert analyzed == {"tokenize": client.post("/tokenize", json={"text": SAMPLE, "method": "sentence"}).json()}
+
+
+def test_analyze_rejects_unknown_operation():
+    assert client.post("/analyze", json={"text": SAMPLE, "operations": ["translate"]}).status_code == 422
+
+
+BATCH = ["First ticket: printer is BROKEN!", "second line, nothing else", "", "Third. Has two sentences!"]
+
+
+def test_batch_endpoints_match_single_item_results():
+    cleaned = client.post("/clean/batch", json=[{"text": t, "lowercase": False} for t in BATCH]).json()
+    tokens = client.post("/tokenize/batch", json=[{"text": t, "method": "sentence"} for t in BATCH]).json()
+    stats = client.post("/stats/batch", json=[{"text": t} for t in BATCH]).json()
+    for i, text in enumerate(BATCH):
+        assert cleaned[i] == client.post("/clean", json={"text": text, "lowercase": False}).json()
+        assert tokens[i] == client.post("/tokenize", json={"text": text, "method": "sentence"}).json()
+        assert stats[i] == client.post("/stats", json={"text": text}).json()
+
+
+def stage_count(stage):
+    prefix = f'app_stage_duration_seconds_count{{stage="{stage}"}} '
+    lines = [line for line in client.get("/metrics").text.splitlines() if line.startswith(prefix)]
+    return int(lines[0][len(prefix):]) if lines else 0
+
+
+def test_large_batch_uses_worker_pool(monkeypatch):
+    monkeypatch.setattr(services, "BATCH_PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr(services, "BATCH_WORKERS", 2)
+    texts = [f"record {i} has {i % 7} words" for i in range(50)]
+    before = stage_count("calculate_stats")
+    try:
+        stats = client.post("/stats/batch", json=[{"text": t} for t in texts]).json()
+        assert services._batch_pool is not None
+    finally:
+        services.shutdown_batch_pool()
+    assert [s["word_count"] for s in stats] == [len(t.split()) for t in texts]
+    # Stage timings recorded in the worker processes are replayed here
+    assert stage_count("calculate_stats") == before + len(texts)
+
+
+def test_concurrent_first_batches_share_one_pool(monkeypatch):
+    import threading
+    import time
+
+    created = []
+
+    class SlowPool:
+        def __init__(self, max_workers):
+            time.sleep(0.05)  # widen the window between the check and the assignment
+            created.append(self)
+
+        def shutdown(self):
+            pass
+
+    monkeypatch.setattr(services, "ProcessPoolExecutor", SlowPool)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(services.get_batch_pool())) for _ in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        services.shutdown_batch_pool()
+    assert len(created) == 1 and all(pool is created[0] for pool in pools)
+
+
+def test_batch_size_limit(monkeypatch):
+    import app.main as main
+
+    monkeypatch.setattr(main, "BATCH_MAX_ITEMS", 2)
+    assert client.post("/stats/batch", json=[{"text": "a"}] * 3).status_code == 413
+
+
+def byte_chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_stream_stats_matches_stats_across_chunk_boundaries():
+    text = "Zürich café naïve words_with_underscores split across chunks. " * 200 + "tail"
+    expected = client.post("/stats", json={"text": text}).json()
+    # 7-byte chunks cut through words and multi-byte UTF-8 characters
+    response = client.post("/stats/stream", content=byte_chunks(text.encode("utf-8"), 7),
+                           headers={"Content-Type": "text/plain"})
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_stream_stats_approximate_unique_words():
+    text = " ".join(f"w{i}" for i in range(50000))
+    response = client.post("/stats/stream?unique=approximate", content=byte_chunks(text.encode(), 4096))
+    result = response.json()
+    assert result["word_count"] == 50000
+    assert abs(result["unique_words"] - 50000) / 50000 < 0.03
+
+
+def test_stream_stats_long_word_split_into_many_pieces():
+    from app.services import MAX_WORD_CHARS, StreamingStats, calculate_stats
+
+    text = "start " + "x" * 200000 + " end " + "y" * 10
+    stats, peak = StreamingStats(), 0
+    for char in text:  # one piece per character used to rescan the whole partial word each time
+        stats.feed(char)
+        peak = max(peak, stats._carry_chars)
+    assert peak == MAX_WORD_CHARS
+    assert stats.result() == calculate_stats(text)
+
+
+NGRAM_TEXT = "The cat sat on the mat. The cat ate the rat. the CAT sat."
+
+
+def test_word_frequency_shape_and_order():
+    result = client.post("/word-frequency", json={"text": NGRAM_TEXT}).json()
+    assert result["unique_words"] == 7
+    assert result["total_words"] == 14
+    assert result["word_frequencies"][:2] == [{"word": "the", "frequency": 5}, {"word": "cat", "frequency": 3}]
+
+
+def test_ngrams_shape_and_top_k():
+    result = client.post("/ngrams", json={"text": NGRAM_TEXT, "n": 2, "top_k": 2}).json()
+    assert result["total_ngrams"] == 13
+    assert result["unique_ngrams"] == 10
+    assert result["ngrams"] == [{"ngram": "the cat", "frequency": 3}, {"ngram": "cat sat", "frequency": 2}]
+
+
+def test_ngrams_capped_tracking_keeps_heavy_hitters():
+    text = " ".join(["alpha beta"] * 500 + [f"noise{i}" for i in range(2000)])
+    exact = client.post("/ngrams", json={"text": text, "n": 2, "top_k": 1}).json()
+    capped = client.post("/ngrams", json={"text": text, "n": 2, "top_k": 1, "max_tracked": 50}).json()
+    assert capped["ngrams"][0]["ngram"] == exact["ngrams"][0]["ngram"] == "alpha beta"
+    assert capped["total_ngrams"] == exact["total_ngrams"]
+    assert abs(capped["unique_ngrams"] - exact["unique_ngrams"]) / exact["unique_ngrams"] < 0.03
+
+
+@pytest.mark.parametrize("text, sentiment", [
+    ("This is a great product! I love it.", "positive"),
+    ("Terrible. It stopped working after a day, waste of money.", "negative"),
+    ("The box arrived on Tuesday.", "neutral"),
+    ("Not good at all.", "negative"),
+    ("Honestly not bad for the price.", "positive"),
+    ("Good screen, bad battery.", "neutral"),
+    ("I don\u2019t like it.", "negative"),
+    ("I \u2018don\u2019t like it.", "negative"),
+])
+def test_sentiment(text, sentiment):
+    result = client.post("/sentiment", json={"text": text}).json()
+    assert result["sentiment"] == sentiment
+    assert -1.0 <= result["score"] <= 1.0
+
+
+def test_sentiment_counts_phrases_once():
+    result = client.post("/sentiment", json={"text": "I highly recommend it, works great."}).json()
+    assert result == {"sentiment": "positive", "score": 1.0, "positive_words": 2, "negative_words": 0}
+
+
+def test_sentiment_batch_matches_single():
+    texts = ["I love it", "awful, never again", "ok"]
+    batch = client.post("/sentiment/batch", json=[{"text": t} for t in texts]).json()
+    assert batch == [client.post("/sentiment", json={"text": t}).json() for t in texts]
+
+
+def test_metrics_report_routes_and_service_stages():
+    client.post("/stats", json={"text": SAMPLE})
+    client.post("/clean/batch", json=[{"text": SAMPLE}] * 3)
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="POST",route="/stats",status="200"}' in text
+    assert 'app_stage_duration_seconds_count{stage="calculate_stats"}' in text
+    assert 'app_stage_duration_seconds_count{stage="clean_result_batch"}' in text
+
+
+def test_offsets_round_trip_from_a_cursor():
+    spans = [(12, 15), (16, 16), (20, 300)]
+    packed, dtype = pack_offsets(array("I", [offset for span in spans for offset in span]), cursor=10)
+    assert dtype == "uint16"
+    # Little-endian (gap, length) pairs whatever the platform
+    assert base64.b64decode(packed) == bytes([2, 0, 3, 0, 1, 0, 0, 0, 4, 0, 24, 1])
+    assert list(decode_offsets(packed, dtype, cursor=10)) == spans
+
+
+@pytest.mark.parametrize("format", ["tokens", "offsets", "ndjson"])
+def test_tokenize_rejects_unknown_method(format):
+    response = client.post("/tokenize", json={"text": SAMPLE, "method": "char", "format": format})
+    assert response.status_code == 422
+    assert client.post("/analyze", json={"text": SAMPLE, "method": "char"}).status_code == 422
+
+
+@pytest.mark.parametrize("method", ["word", "sentence"])
+def test_tokenize_offsets_slice_to_the_tokens(method):
+    text = SAMPLE * 30
+    tokens = client.post("/tokenize", json={"text": text, "method": method}).json()["tokens"]
+    result = client.post("/tokenize", json={"text": text, "method": method, "format": "offsets"}).json()
+    assert result["count"] == len(tokens) and result["next_cursor"] is None
+    assert [text[start:end] for start, end in decode_offsets(result["offsets"], result["dtype"])] == tokens
+
+
+@pytest.mark.parametrize("method", ["word", "sentence"])
+@pytest.mark.parametrize("format", ["tokens", "offsets"])
+def test_tokenize_cursor_pagination_covers_every_token_once(method, format):
+    text = SAMPLE * 7
+    expected = client.post("/tokenize", json={"text": text, "method": method}).json()["tokens"]
+    tokens, cursor = [], 0
+    while cursor is not None:
+        page = client.post("/tokenize", json={"text": text, "method": method, "format": format,
+                                              "cursor": cursor, "limit": 4}).json()
+        assert page["count"] <= 4
+        if format == "offsets":
+            tokens += [text[start:end] for start, end in decode_offsets(page["offsets"], page["dtype"], cursor)]
+        else:
+            tokens += page["tokens"]
+        cursor = page["next_cursor"]
+    assert tokens == expected
+
+
+@pytest.mark.parametrize("method", ["word", "sentence"])
+def test_tokenize_page_reports_the_total(method):
+    text = SAMPLE * 7
+    expected = client.post("/tokenize", json={"text": text, "method": method}).json()["count"]
+    page = client.post("/tokenize", json={"text": text, "method": method, "limit": 3,
+                                          "include_total": True}).json()
+    assert (page["count"], page["total"]) == (3, expected)
+    assert "total" not in client.post("/tokenize", json={"text": text, "limit": 3}).json()
+
+
+def test_tokenize_batch_honours_paging():
+    items = [{"text": t, "format": "offsets", "cursor": 2, "limit": 2} for t in BATCH]
+    assert client.post("/tokenize/batch", json=items).json() == [
+        client.post("/tokenize", json=item).json() for item in items]
+    response = client.post("/tokenize/batch", json=[{"text": SAMPLE}, {"text": SAMPLE, "format": "ndjson"}])
+    assert response.status_code == 422
+
+
+def test_tokenize_offsets_use_a_wider_type_when_needed():
+    text = "a " + "b" * 300
+    result = client.post("/tokenize", json={"text": text, "format": "offsets"}).json()
+    assert result["dtype"] == "uint16"
+    assert list(decode_offsets(result["offsets"], result["dtype"])) == [(0, 1), (2, 302)]
+
+
+def test_tokenize_ndjson_stream(monkeypatch):
+    monkeypatch.setattr(services, "NDJSON_CHUNK_TOKENS", 3)
+    with client.stream("POST", "/tokenize", json={"text": SAMPLE, "format": "ndjson", "limit": 5}) as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+    tokens = client.post("/tokenize", json={"text": SAMPLE}).json()["tokens"]
+    assert [line["token"] for line in lines[:-1]] == tokens[:5]
+    assert all(SAMPLE[line["start"]:line["end"]] == line["token"] for line in lines[:-1])
+    result = client.post("/tokenize", json={"text": SAMPLE, "format": "offsets"}).json()
+    spans = list(decode_offsets(result["offsets"], result["dtype"]))
+    assert lines[-1] == {"count": 5, "next_cursor": spans[5][0]}
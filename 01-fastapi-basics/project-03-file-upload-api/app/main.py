@@ -1,9 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.routers import upload
+from app.metrics import instrument
+from app.routers import search, similar, upload
+from app.services.executor import get_executor, shutdown_executor
+from app.services.pdf_processor import preload
+from app.services import search_index, vector_index
 
 app = FastAPI(title="File Upload & Processing API", version="1.0.0")
+app.state.ready = False
 
 # CORS for frontend integration (optional)
 app.add_middleware(
@@ -15,6 +21,34 @@ app.add_middleware(
 )
 
 app.include_router(upload.router)
+app.include_router(search.router)
+app.include_router(similar.router)
+instrument(app)
+
+@app.on_event("startup")
+async def startup():
+    # Load PDF/keyword resources and start the worker pool before taking traffic
+    preload()
+    get_executor()
+    upload.job_queue.start()
+    app.state.ready = True
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.ready = False
+    await upload.job_queue.stop()
+    shutdown_executor()
+    if search_index.search_index is not None:
+        search_index.search_index.close()
+    if vector_index.vector_index is not None:
+        vector_index.vector_index.wait_for_training()
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until startup has finished loading resources."""
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
 
 @app.get("/")
 async def root():
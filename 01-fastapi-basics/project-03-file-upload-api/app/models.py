@@ -8,4 +8,37 @@ class UploadResponse(BaseModel):
     extracted_text: Optional[str] = None  # Optional to avoid large responses
 
 class ErrorResponse(BaseModel):
-    detail: str
\ No newline at end of file
+    detail: str
+
+class BatchErrorResponse(ErrorResponse):
+    filename: str
+
+class JobStatusResponse(BaseModel):
+    id: str
+    status: str  # queued, running, done or failed
+    filename: str
+    priority: int
+    result: Optional[UploadResponse] = None
+    error: Optional[str] = None
+
+class SearchHit(BaseModel):
+    filename: str
+    page: int
+    score: float
+    snippet: str
+
+class SearchResponse(BaseModel):
+    query: str
+    total_hits: int  # matching pages, of which `hits` are the best
+    hits: List[SearchHit]
+
+class SimilarHit(BaseModel):
+    filename: str
+    chunk: int  # position of the chunk within its document
+    score: float  # cosine similarity
+    text: str
+
+class SimilarResponse(BaseModel):
+    query: str
+    mode: str  # exact or ivf (ivf falls back to exact until enough chunks are stored)
+    hits: List[SimilarHit]
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from app.models import SearchResponse
+from app.services import search_index as search_index_module
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+def get_index():
+    index = search_index_module.search_index
+    if index is None:
+        raise HTTPException(status_code=503, detail="Search is disabled; set SEARCH_INDEX_DIR to enable it")
+    return index
+
+@router.get("/", response_model=SearchResponse)
+async def search(q: str = Query(..., min_length=1, max_length=500), limit: int = Query(10, ge=1, le=100)):
+    """BM25-ranked pages of processed PDFs matching the query, with snippets."""
+    index = get_index()
+    total_hits, hits = await run_in_threadpool(index.search, q, limit)
+    return SearchResponse(query=q, total_hits=total_hits, hits=hits)
+
+@router.get("/stats")
+async def search_stats():
+    """Indexed documents, pages and segments."""
+    return get_index().stats()
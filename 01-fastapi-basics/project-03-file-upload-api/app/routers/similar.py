@@ -0,0 +1,29 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from app.models import SimilarResponse
+from app.services import vector_index as vector_index_module
+from app.services.vector_index import IVF_NPROBE
+
+router = APIRouter(prefix="/similar", tags=["similar"])
+
+def get_index():
+    index = vector_index_module.vector_index
+    if index is None:
+        raise HTTPException(status_code=503, detail="Similarity search is disabled; set VECTOR_INDEX_DIR to enable it")
+    return index
+
+@router.get("/", response_model=SimilarResponse)
+async def similar(q: str = Query(..., min_length=1, max_length=10000), k: int = Query(10, ge=1, le=100),
+                  mode: Literal["exact", "ivf"] = "ivf", nprobe: int = Query(IVF_NPROBE, ge=1, le=1024)):
+    """Chunks of processed PDFs most similar to the query text."""
+    index = get_index()
+    used, hits = await run_in_threadpool(index.search, q, k, mode, nprobe)
+    return SimilarResponse(query=q, mode=used, hits=hits)
+
+@router.get("/stats")
+async def similar_stats():
+    """Stored documents and chunks, and the state of the IVF quantizer."""
+    return get_index().stats()
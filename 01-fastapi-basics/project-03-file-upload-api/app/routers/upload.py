@@ -1,47 +1,181 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-import shutil
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import os
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, List
 
-from app.models import UploadResponse, ErrorResponse
-from app.services.pdf_processor import PDFProcessor
+from app.models import UploadResponse, ErrorResponse, BatchErrorResponse, JobStatusResponse
+from app.services.executor import run_blocking
+from app.services.jobs import JOB_RETRY_AFTER, JobQueue, JobStore, QueueFullError
+from app.services.pdf_processor import PDFProcessor, PDFSource
+from app.services import search_index as search_index_module
+from app.services import vector_index as vector_index_module
+from app.services.result_cache import result_cache
+from app.services.upload_io import StoredUpload, UploadTooLargeError, receive_upload
 
 router = APIRouter(prefix="/upload", tags=["uploads"])
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
+BATCH_CONCURRENCY = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", str(os.cpu_count() or 4)))
+BATCH_MAX_FILES = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "500"))
+
+async def receive_pdf(file: UploadFile, spool: bool = True) -> StoredUpload:
+    """Read an upload into memory or a temp file under UPLOAD_DIR (413 when too large)."""
+    try:
+        if spool:
+            return await receive_upload(file, UPLOAD_DIR)
+        return await receive_upload(file, UPLOAD_DIR, spool_max_bytes=0)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+async def process_upload(filename: str, source: PDFSource, content_hash: str) -> UploadResponse:
+    """Process PDF bytes or a stored file, or serve the result from the cache."""
+    index = search_index_module.search_index
+    vectors = vector_index_module.vector_index
+    # A cached result is only enough when the indexes already have the document
+    # (either may have been swapped for a new one since the result was cached)
+    if (index is None or content_hash in index) and (vectors is None or content_hash in vectors):
+        cached = await result_cache.get_async(content_hash)
+        if cached is not None:
+            return UploadResponse(filename=filename, **cached)
+
+    # Extract and process off the event loop
+    if index is None:
+        text, word_count, top_keywords = await run_blocking(PDFProcessor.process_file, source)
+    else:
+        pages, word_count, top_keywords = await run_blocking(PDFProcessor.process_pages, source)
+        text = '\n'.join(pages).strip()
+        # Optional indexing stage: make the pages searchable through /search
+        await run_in_threadpool(index.add_document, filename, content_hash, pages)
+    if vectors is not None:
+        # Optional embedding stage for /similar
+        await run_in_threadpool(vectors.add_document, filename, content_hash, text)
+
+    response = UploadResponse(
+        filename=filename,
+        word_count=word_count,
+        top_keywords=top_keywords,
+        extracted_text=text[:500] + "..." if len(text) > 500 else text  # Truncate for response
+    )
+    await result_cache.put_async(content_hash, response.model_dump(exclude={"filename"}))
+    return response
+
+async def process_saved_upload(filename: str, file_path: Path, content_hash: str) -> UploadResponse:
+    """Process an upload stored on disk, then delete it."""
+    try:
+        return await process_upload(filename, str(file_path), content_hash)
+    finally:
+        file_path.unlink(missing_ok=True)
 
 @router.post("/", response_model=UploadResponse)
 async def upload_pdf(file: UploadFile = File(...)):
     """Upload and process a PDF file."""
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-    
-    # Save uploaded file
-    file_path = UPLOAD_DIR / file.filename
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
+
+    # Small PDFs stay in memory; large ones are spooled to a temp file removed on exit
+    with await receive_pdf(file) as stored:
+        try:
+            return await process_upload(stored.filename, stored.source, stored.content_hash)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+# Background jobs: uploads are stored and processed by priority, results kept in SQLite
+job_queue = JobQueue(JobStore(), process_saved_upload)
+
+def queue_full_error(detail: str) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(JOB_RETRY_AFTER)})
+
+async def job_status(job_id: str) -> JobStatusResponse:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(**job)
+
+async def stream_batch_results(items: List[StoredUpload], errors: List[BatchErrorResponse]) -> AsyncIterator[str]:
+    """Yield one NDJSON line per file, in completion order."""
+    for error in errors:
+        yield error.model_dump_json() + "\n"
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(stored: StoredUpload) -> str:
+        async with semaphore:
+            try:
+                with stored:
+                    result = await process_upload(stored.filename, stored.source, stored.content_hash)
+            except Exception as e:
+                return BatchErrorResponse(filename=stored.filename, detail=str(e)).model_dump_json()
+            return result.model_dump_json()
+
+    tasks = [asyncio.create_task(run(stored)) for stored in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done + "\n"
+    finally:
+        # Client went away or we finished: stop pending work and drop leftovers
+        for task in tasks:
+            task.cancel()
+        for stored in items:
+            stored.cleanup()
+
+@router.post("/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """Upload many PDFs and stream one NDJSON result per file as each finishes."""
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_FILES} files per batch")
+
+    items: List[StoredUpload] = []
+    errors: List[BatchErrorResponse] = []
+    try:
+        for file in files:
+            if not file.filename.endswith('.pdf'):
+                errors.append(BatchErrorResponse(filename=file.filename, detail="Only PDF files are allowed"))
+                continue
+            # Read before responding: form files are closed once the handler returns
+            try:
+                items.append(await receive_upload(file, UPLOAD_DIR))
+            except UploadTooLargeError as e:
+                errors.append(BatchErrorResponse(filename=file.filename, detail=str(e)))
+    except BaseException:
+        for stored in items:
+            stored.cleanup()
+        raise
+
+    return StreamingResponse(stream_batch_results(items, errors), media_type="application/x-ndjson")
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def create_job(file: UploadFile = File(...), priority: int = Query(0, ge=0, le=9)):
+    """Store a PDF for background processing and return its job id immediately."""
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    # Reject before writing anything when the queue is already full
+    if job_queue.pending >= job_queue.max_pending:
+        raise queue_full_error("Job queue is full, try again later")
+
+    # Jobs outlive the request, so the upload always goes to disk
+    stored = await receive_pdf(file, spool=False)
     try:
-        # Extract and process
-        text = PDFProcessor.extract_text(file_path)
-        word_count, top_keywords = PDFProcessor.process_text(text)
-        
-        # Clean up uploaded file
-        os.unlink(file_path)
-        
-        return UploadResponse(
-            filename=file.filename,
-            word_count=word_count,
-            top_keywords=top_keywords,
-            extracted_text=text[:500] + "..." if len(text) > 500 else text  # Truncate for response
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        job_id = await job_queue.submit(stored.filename, stored.path, stored.content_hash, priority)
+    except QueueFullError as e:
+        stored.cleanup()
+        raise queue_full_error(str(e))
+    return await job_status(job_id)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Status of a background job, with its result once done."""
+    return await job_status(job_id)
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Result cache sizes and hit/miss counters."""
+    return result_cache.stats()
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
@@ -0,0 +1,59 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.metrics import capture_stages, replay_stages
+from app.services.pdf_processor import preload
+
+# How CPU-heavy PDF work is run: "process" (default), "thread" or "inline"
+EXECUTION_MODE = os.getenv("PDF_EXECUTION_MODE", "process").lower()
+MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", "0")) or None
+
+_VALID_MODES = ("process", "thread", "inline")
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    """Return the shared executor, creating it on first use."""
+    global _executor
+    if EXECUTION_MODE not in _VALID_MODES:
+        raise ValueError(f"Invalid PDF_EXECUTION_MODE: {EXECUTION_MODE}")
+    if EXECUTION_MODE == "inline":
+        return None
+    if _executor is None:
+        if EXECUTION_MODE == "process":
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=preload)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+def _call_capturing_stages(func: Callable[..., Any], args, kwargs) -> Tuple[Any, List[Tuple[str, float]]]:
+    """Runs in a worker process: return the result with the stage timings it recorded."""
+    with capture_stages() as stages:
+        result = func(*args, **kwargs)
+    return result, stages
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking function without stalling the event loop."""
+    executor = get_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    if not isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+    # Worker processes have their own metrics registry, so bring their timings back
+    result, stages = await loop.run_in_executor(executor, partial(_call_capturing_stages, func, args, kwargs))
+    replay_stages(stages)
+    return result
+
+
+def shutdown_executor() -> None:
+    """Stop the shared executor (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
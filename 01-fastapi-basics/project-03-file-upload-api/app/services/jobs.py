@@ -0,0 +1,223 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "uploads/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "5"))  # seconds suggested to rejected clients
+# Finished jobs are deleted this many seconds after they finish; 0 keeps them forever
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_SWEEP_INTERVAL = 3600  # seconds between retention sweeps
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when JOB_MAX_PENDING jobs are already waiting."""
+
+
+class JobStore:
+    """Job metadata and results in a local SQLite database (no external broker).
+
+    Methods block on SQLite; JobQueue and the router call them through
+    run_in_threadpool so the event loop keeps serving requests.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (call with the lock held).
+
+        The router builds its store at import time; deferring the connection
+        keeps imports, tests and tooling from creating the database file.
+        """
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+            self._conn = conn
+        return self._conn
+
+    def create(self, job_id: str, filename: str, file_path: str, content_hash: str, priority: int) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO jobs (id, filename, file_path, content_hash, priority, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, file_path, content_hash, priority, QUEUED, time.time()),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_status(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                   error: Optional[str] = None) -> None:
+        finished_at = time.time() if status in (DONE, FAILED) else None
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, finished_at, job_id),
+            )
+
+    def delete_finished(self, before: float) -> int:
+        """Delete done and failed jobs that finished before the given time; return how many."""
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM jobs WHERE finished_at < ? AND status IN (?, ?)", (before, DONE, FAILED)
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JobQueue:
+    """Priority queue of stored uploads drained by a fixed number of async workers.
+
+    Higher priority runs first; equal priorities run in submission order.
+    Jobs that finished more than retention seconds ago are swept from the
+    store every JOB_SWEEP_INTERVAL seconds (never, when retention is 0).
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[str, Path, str], Awaitable[Any]],
+                 workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING,
+                 retention: float = JOB_RETENTION_SECONDS):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._order = itertools.count()
+        self._submitting = 0  # jobs being written to the store, counted as pending
+
+    @property
+    def pending(self) -> int:
+        return (self._queue.qsize() if self._queue is not None else 0) + self._submitting
+
+    def start(self) -> None:
+        """Start workers and re-queue jobs left unfinished by a previous run.
+
+        Called once at startup, before traffic, so the store is read inline.
+        """
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        for job in self.store.unfinished():
+            if Path(job["file_path"]).exists():
+                self.store.set_status(job["id"], QUEUED)
+                self._queue.put_nowait((-job["priority"], next(self._order), job["id"]))
+            else:
+                self.store.set_status(job["id"], FAILED, error="Upload lost before processing")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.retention > 0:
+            self._tasks.append(asyncio.create_task(self._sweep_periodically()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, filename: str, file_path: Path, content_hash: str, priority: int = 0) -> str:
+        """Record and enqueue a job, or raise QueueFullError."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+        if self.pending >= self.max_pending:
+            raise QueueFullError(f"{self.pending} jobs already waiting")
+        job_id = uuid.uuid4().hex
+        self._submitting += 1
+        try:
+            await run_in_threadpool(self.store.create, job_id, filename, str(file_path), content_hash, priority)
+        finally:
+            self._submitting -= 1
+        self._queue.put_nowait((-priority, next(self._order), job_id))
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The stored job, or None if it does not exist (or was swept)."""
+        return await run_in_threadpool(self.store.get, job_id)
+
+    async def join(self) -> None:
+        """Wait until every job submitted so far has finished."""
+        await self._queue.join()
+
+    async def sweep(self) -> int:
+        """Delete jobs that finished more than retention seconds ago; return how many."""
+        return await run_in_threadpool(self.store.delete_finished, time.time() - self.retention)
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.retention, JOB_SWEEP_INTERVAL))
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Job retention sweep failed")
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                job = await self.get(job_id)
+                if job is None:
+                    continue  # deleted before a worker reached it
+                await run_in_threadpool(self.store.set_status, job_id, RUNNING)
+                try:
+                    result = await self.handler(job["filename"], Path(job["file_path"]), job["content_hash"])
+                except Exception as e:
+                    await run_in_threadpool(self.store.set_status, job_id, FAILED, error=str(e))
+                else:
+                    await run_in_threadpool(self.store.set_status, job_id, DONE, result=result.model_dump())
+            except Exception:
+                logger.exception("Job %s could not be processed", job_id)
+            finally:
+                self._queue.task_done()
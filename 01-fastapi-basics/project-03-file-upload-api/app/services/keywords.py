@@ -0,0 +1,122 @@
+import heapq
+import os
+import re
+from collections import Counter, deque
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Approximates NLTK's Treebank word tokenizer closely enough that token
+# counts and keyword rankings match on ordinary prose, at a fraction of the cost.
+# Treebank never splits off / = + ~ ^ | or \, so "a/b", "x=1" and the
+# "//host/path" part of a URL stay single (non-keyword) tokens.
+TOKEN_PATTERN = re.compile(r"""
+      \b(?:can(?=not\b)|gon(?=na\b)|got(?=ta\b)|wan(?=na\b)|gim(?=me\b)|lem(?=me\b))  # "can" "not"
+    | '(?=t(?:is|was)\b)t         # "'t" in "'tis", "'twas"
+    | \w+(?=n't\b)              # "do" in "don't", "ca" in "can't"
+    | n't\b
+    | '(?:s|m|d|ll|re|ve)\b      # clitics: 's 'm 'd 'll 're 've
+    | [\w/=+~^|\\]+(?:\.[\w/=+~^|\\]+)+\.(?=\s+\S)  # "u.s.a." or "e.g." with text after it
+    | [\w/=+~^|\\]+(?:-\w+|[,:]\d+|\.[\w/=+~^|\\]+|'(?!(?:s|m|d|ll|re|ve)\b)\w+)*  # words, "3,500.00", "10:30"
+    | \.\.\.|--                 # ellipsis, dash
+    | [^\w\s]                   # any other punctuation mark
+""", re.VERBOSE)
+WHITESPACE = re.compile(r"\s")
+
+
+def parse_ngram_range(value: str) -> Tuple[int, int]:
+    """Parse "N" (only N-grams) or "MIN,MAX" into (min_n, max_n), with 1 <= min_n <= max_n."""
+    try:
+        bounds = tuple(int(part) for part in value.split(","))
+    except ValueError:
+        bounds = ()
+    if len(bounds) == 1:
+        bounds *= 2
+    if len(bounds) != 2 or not 1 <= bounds[0] <= bounds[1]:
+        raise ValueError(f"KEYWORD_NGRAM_RANGE must be N or MIN,MAX with 1 <= MIN <= MAX, got {value!r}")
+    return bounds
+
+
+# Opt-in keyphrase mode, e.g. "1,3" ranks unigrams through trigrams
+NGRAM_RANGE = parse_ngram_range(os.getenv("KEYWORD_NGRAM_RANGE", "1,1"))
+
+# Large strings are tokenized in pieces of roughly this many characters
+CHUNK_CHARS = 1 << 20
+
+
+def iter_text_chunks(text: str, chunk_chars: int = CHUNK_CHARS) -> Iterator[str]:
+    """Split text into pieces of about chunk_chars, cutting only at whitespace."""
+    start, length = 0, len(text)
+    while start < length:
+        match = WHITESPACE.search(text, min(start + chunk_chars, length))
+        end = match.start() if match else length
+        yield text[start:end]
+        start = end + 1
+
+
+# Bundled resources (NLTK's English stopword list), so nothing is downloaded at runtime
+DATA_DIR = Path(os.getenv("APP_DATA_DIR", str(Path(__file__).resolve().parent.parent / "data")))
+
+
+@lru_cache(maxsize=None)
+def english_stop_words() -> FrozenSet[str]:
+    """English stopword list, read from DATA_DIR once per process."""
+    path = DATA_DIR / "stopwords" / "english"
+    return frozenset(path.read_text(encoding="utf-8").split())
+
+
+class KeywordEngine:
+    """Counts tokens and ranks keywords (or keyphrases) over a stream of text chunks."""
+
+    def __init__(self, stop_words: Optional[FrozenSet[str]] = None, ngram_range: Tuple[int, int] = (1, 1)):
+        min_n, max_n = ngram_range
+        if not 1 <= min_n <= max_n:
+            raise ValueError(f"Invalid ngram_range: {ngram_range}")
+        self._stop_words = stop_words
+        self.ngram_range = ngram_range
+
+    @property
+    def stop_words(self) -> FrozenSet[str]:
+        if self._stop_words is None:
+            self._stop_words = english_stop_words()
+        return self._stop_words
+
+    def count(self, chunks: Iterable[str]) -> Tuple[int, Counter]:
+        """Return (token count, keyword counts) for an iterable of text chunks.
+
+        Chunks are tokenized independently, so they should break on
+        whitespace (e.g. one chunk per PDF page).
+        """
+        stop_words = self.stop_words
+        min_n, max_n = self.ngram_range
+        counts: Counter = Counter()
+        word_count = 0
+        for chunk in chunks:
+            tokens = TOKEN_PATTERN.findall(chunk.lower())
+            word_count += len(tokens)
+            if max_n == 1:
+                counts.update(t for t in tokens if t.isalpha() and t not in stop_words)
+                continue
+            # Keyphrases: n-grams over runs of keywords, broken by stopwords/punctuation
+            window: deque = deque(maxlen=max_n)
+            for token in tokens:
+                if not token.isalpha() or token in stop_words:
+                    window.clear()
+                    continue
+                window.append(token)
+                run = list(window)
+                for n in range(min_n, len(run) + 1):
+                    counts[' '.join(run[-n:])] += 1
+        return word_count, counts
+
+    def extract(self, text: Union[str, Iterable[str]], top_n: int = 5) -> Tuple[int, List[str]]:
+        """Return (token count, top_n keywords) for a string or iterable of chunks."""
+        chunks = iter_text_chunks(text) if isinstance(text, str) else text
+        word_count, counts = self.count(chunks)
+        # heapq.nlargest is stable, so ties keep first-seen order like Counter.most_common
+        top = heapq.nlargest(top_n, counts.items(), key=itemgetter(1))
+        return word_count, [word for word, _ in top]
+
+
+keyword_engine = KeywordEngine(ngram_range=NGRAM_RANGE)
@@ -1,37 +1,87 @@
-import PyPDF2
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from collections import Counter
-from typing import List, Tuple
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Tuple, Union
 
-# Download NLTK data (run once)
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
+from app.metrics import stage_timer
+from app.services.keywords import english_stop_words, keyword_engine
+
+# Characters kept per page; anything beyond is dropped
+MAX_PAGE_CHARS = int(os.getenv("PDF_MAX_PAGE_CHARS", "200000"))
+
+# Bump whenever a change to extraction or keyword ranking alters results, so
+# cached results from older code are not served
+PROCESSING_VERSION = 1
+
+# A PDF given either as its bytes (small uploads kept in memory) or a file path
+PDFSource = Union[bytes, str]
+
+@contextmanager
+def open_pdf(source: PDFSource) -> Iterator[BinaryIO]:
+    """Seekable stream over a PDF; files are memory-mapped instead of read into buffers."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+        return
+    with open(source, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield file  # empty files can't be mapped; let PyPDF2 report them
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
 
 class PDFProcessor:
     @staticmethod
-    def extract_text(file_path: str) -> str:
-        """Extract text from PDF file."""
+    def iter_pages(source: PDFSource, max_page_chars: int = MAX_PAGE_CHARS) -> Iterator[str]:
+        """Yield the text of each PDF page, truncated to max_page_chars."""
+        import PyPDF2  # imported on first use to keep startup fast
+
+        with open_pdf(source) as stream:
+            reader = PyPDF2.PdfReader(stream)
+            for page in reader.pages:
+                yield (page.extract_text() or '')[:max_page_chars]
+
+    @staticmethod
+    def extract_pages(source: PDFSource, max_page_chars: int = MAX_PAGE_CHARS) -> List[str]:
+        """Extract the text of each page from a PDF file path or PDF bytes."""
         try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ''
-                for page in reader.pages:
-                    text += page.extract_text() + '\n'
-                return text.strip()
+            with stage_timer("pdf_extract_text"):
+                return list(PDFProcessor.iter_pages(source, max_page_chars))
         except Exception as e:
             raise ValueError(f"Error extracting text: {str(e)}")
 
+    @staticmethod
+    def extract_text(source: PDFSource, max_page_chars: int = MAX_PAGE_CHARS) -> str:
+        """Extract text from a PDF file path or PDF bytes."""
+        return '\n'.join(PDFProcessor.extract_pages(source, max_page_chars)).strip()
+
     @staticmethod
     def process_text(text: str, top_n: int = 5) -> Tuple[int, List[str]]:
         """Process text: count words and extract top keywords."""
-        tokens = word_tokenize(text.lower())
-        stop_words = set(stopwords.words('english'))
-        filtered_tokens = [word for word in tokens if word.isalpha() and word not in stop_words]
-        
-        word_count = len(tokens)
-        keyword_counts = Counter(filtered_tokens)
-        top_keywords = [word for word, _ in keyword_counts.most_common(top_n)]
-        
-        return word_count, top_keywords
\ No newline at end of file
+        with stage_timer("pdf_process_text"):
+            return keyword_engine.extract(text, top_n)
+
+    @staticmethod
+    def process_file(source: PDFSource, top_n: int = 5) -> Tuple[str, int, List[str]]:
+        """Extract and process a PDF in one call (safe to run in a worker process)."""
+        text = PDFProcessor.extract_text(source)
+        word_count, top_keywords = PDFProcessor.process_text(text, top_n)
+        return text, word_count, top_keywords
+
+    @staticmethod
+    def process_pages(source: PDFSource, top_n: int = 5) -> Tuple[List[str], int, List[str]]:
+        """Like process_file, but return the text of each page (for the search index)."""
+        pages = PDFProcessor.extract_pages(source)
+        word_count, top_keywords = PDFProcessor.process_text('\n'.join(pages).strip(), top_n)
+        return pages, word_count, top_keywords
+
+def settings_fingerprint() -> str:
+    """Short hash of everything besides the PDF itself that shapes a processing result."""
+    settings = f"{PROCESSING_VERSION}:{MAX_PAGE_CHARS}:{keyword_engine.ngram_range}"
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+
+def preload() -> None:
+    """Load PyPDF2 and the stopword list so the first upload doesn't pay for it."""
+    import PyPDF2  # noqa: F401
+    english_stop_words()
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.pdf_processor import settings_fingerprint
+
+# Memory tier budget in bytes of serialized results
+CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Optional on-disk tier; disabled unless a directory is given
+CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")
+CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+# Once over budget, the disk tier evicts down to this fraction of it in one go
+CACHE_DISK_LOW_WATER = 0.9
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) cache of processing results keyed by content hash.
+
+    namespace is folded into every key, so results computed under other
+    settings (see pdf_processor.settings_fingerprint) are never served. The
+    disk tier is indexed in memory when the cache is created; file reads,
+    writes and deletes happen outside the lock, and get_async()/put_async()
+    run them in a worker thread for callers on the event loop.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = CACHE_DISK_MAX_BYTES, namespace: str = ""):
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.namespace = namespace
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> file size, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            entries = [(p.stat(), p.stem) for p in self.disk_dir.glob("*/*.json")]
+            for stat, key in sorted(entries, key=lambda entry: entry[0].st_mtime):
+                self._disk[key] = stat.st_size
+                self._disk_bytes += stat.st_size
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None."""
+        key = self._key(key)
+        data = self._memory_get(key)
+        if data is None:
+            data = self._disk_get(key)
+        return None if data is None else json.loads(data)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() for async callers: a disk tier lookup runs in a worker thread."""
+        key = self._key(key)
+        data = self._memory_get(key)
+        if data is None and self.disk_dir is not None:
+            data = await run_in_threadpool(self._disk_get, key)
+        return None if data is None else json.loads(data)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON-serializable result under key in every tier."""
+        key = self._key(key)
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    async def put_async(self, key: str, value: Dict[str, Any]) -> None:
+        """put() for async callers: the disk tier write runs in a worker thread."""
+        if self.disk_dir is None:
+            self.put(key, value)
+        else:
+            await run_in_threadpool(self.put, key, value)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers and reset counters."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            keys = list(self._disk)
+            self._disk.clear()
+            self._disk_bytes = 0
+            self.memory_hits = self.disk_hits = self.misses = 0
+        self._disk_unlink(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry counts, sizes and hit/miss counters."""
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_enabled": self.disk_dir is not None,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def _key(self, key: str) -> str:
+        if not self.namespace:
+            return key
+        return hashlib.sha256(f"{self.namespace}:{key}".encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            elif self.disk_dir is None:
+                self.misses += 1
+            return data
+
+    def _memory_put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if self.disk_dir is None:
+            return None
+        with self._lock:
+            known = key in self._disk
+        data = None
+        if known:
+            path = self._disk_path(key)
+            try:
+                data = path.read_bytes()
+                os.utime(path)  # keep recency across restarts
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                if known and key in self._disk:  # removed behind our back
+                    self._disk_bytes -= self._disk.pop(key)
+                return None
+            self.disk_hits += 1
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._memory_put(key, data)
+            return data
+
+    def _disk_put(self, key: str, data: bytes) -> None:
+        if self.disk_dir is None or len(data) > self.disk_max_bytes:
+            return
+        path = self._disk_path(key)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        evicted = []
+        with self._lock:
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            if self._disk_bytes > self.disk_max_bytes:
+                low_water = self.disk_max_bytes * CACHE_DISK_LOW_WATER
+                while self._disk_bytes > low_water and len(self._disk) > 1:
+                    old_key, size = self._disk.popitem(last=False)
+                    self._disk_bytes -= size
+                    evicted.append(old_key)
+        self._disk_unlink(evicted)
+
+    def _disk_unlink(self, keys: List[str]) -> None:
+        for key in keys:
+            self._disk_path(key).unlink(missing_ok=True)
+
+
+result_cache = ResultCache(disk_dir=CACHE_DIR or None, namespace=settings_fingerprint())
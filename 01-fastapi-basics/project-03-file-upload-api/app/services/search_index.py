@@ -0,0 +1,522 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import timed
+from app.services.keywords import english_stop_words
+
+# On-disk index of processed pages; search is disabled unless a directory is given
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "")
+# Segments of a similar size are merged in the background once this many pile up
+SEARCH_MERGE_FACTOR = int(os.getenv("SEARCH_MERGE_FACTOR", "10"))
+SNIPPET_CHARS = 200
+# Terms decoded per step when merging segments (bounds merge memory)
+MERGE_BATCH_TERMS = 65536
+# Stored documents are copied between segment files in blocks of this size
+MERGE_COPY_BYTES = 1 << 20
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+WORD = re.compile(r"\w+")
+
+# Columns of a segment's terms.idx (one row of uint64 per term, sorted by term)
+TERM_END, POSTINGS_OFFSET, POSTINGS_LENGTH, DOC_FREQ = range(4)
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords, as indexed and queried."""
+    stop_words = english_stop_words()
+    return [t for t in WORD.findall(text.lower()) if t not in stop_words]
+
+
+def varint_sizes(values: np.ndarray) -> np.ndarray:
+    """Bytes each value takes as a varint."""
+    sizes = np.ones(len(values), dtype=np.int64)
+    for bits in range(7, 64, 7):
+        sizes += values >= np.uint64(1 << bits)
+    return sizes
+
+
+def encode_varints(values: np.ndarray, sizes: Optional[np.ndarray] = None) -> bytes:
+    """LEB128-encode non-negative integers (7 bits per byte, high bit = more follows)."""
+    values = values.astype(np.uint64)
+    if sizes is None:
+        sizes = varint_sizes(values)
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    starts = np.cumsum(sizes) - sizes
+    for k in range(int(sizes.max(initial=0))):
+        mask = sizes > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(sizes[mask] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[starts[mask] + k] = byte
+    return out.tobytes()
+
+
+def decode_varints(data: bytes) -> np.ndarray:
+    """Inverse of encode_varints, vectorized so long postings lists decode in C."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) == len(raw):
+        return raw.astype(np.uint64)  # every value fit in one byte
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = ((np.arange(len(raw)) - starts[group]) * 7).astype(np.uint64)
+    return np.add.reduceat((raw & 0x7F).astype(np.uint64) << shifts, starts)
+
+
+def encode_postings(doc_freqs: np.ndarray, docs: np.ndarray, tfs: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """Encode the postings of consecutive terms in one pass.
+
+    Term i owns the next doc_freqs[i] entries of docs (ascending) and tfs.
+    Doc ids are stored as deltas interleaved with term frequencies, and
+    each term's byte length is returned alongside the encoded bytes.
+    """
+    starts = np.cumsum(doc_freqs) - doc_freqs
+    deltas = np.diff(docs.astype(np.int64), prepend=0)
+    deltas[starts] = docs[starts]  # each term's list starts from doc 0
+    pairs = np.empty(2 * len(docs), dtype=np.uint64)
+    pairs[0::2] = deltas
+    pairs[1::2] = tfs
+    sizes = varint_sizes(pairs)
+    lengths = np.add.reduceat(sizes[0::2] + sizes[1::2], starts) if len(starts) else starts
+    return encode_varints(pairs, sizes), lengths
+
+
+def decode_postings(data: bytes, doc_freqs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of encode_postings: (doc ids, term frequencies) of consecutive terms."""
+    pairs = decode_varints(data)
+    deltas = pairs[0::2].astype(np.int64)
+    totals = np.cumsum(deltas)
+    starts = np.cumsum(doc_freqs) - doc_freqs
+    docs = totals - np.repeat(totals[starts] - deltas[starts], doc_freqs)
+    return docs, pairs[1::2].astype(np.float32)
+
+
+def _map_bytes(path: Path) -> bytes:
+    """Read-only mapping of a file (empty files can't be mapped)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _map_array(path: Path, dtype) -> np.ndarray:
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class _SegmentWriter:
+    """Writes one immutable segment; terms must be added in sorted order."""
+
+    def __init__(self, path: Path):
+        path.mkdir()
+        self.path = path
+        self._terms = open(path / "terms.bin", "wb")
+        self._postings = open(path / "postings.bin", "wb")
+        self._docs = open(path / "docs.bin", "wb")
+        self._term_index = array("Q")
+        self._doc_ends = array("Q")
+        self._lengths = array("I")
+        self._term_bytes = self._postings_bytes = self._doc_bytes = 0
+
+    @property
+    def doc_count(self) -> int:
+        return len(self._lengths)
+
+    def add_docs(self, blobs: List[bytes], lengths: List[int]) -> None:
+        """Add compressed stored documents (see _pack_doc) with their token counts."""
+        for blob in blobs:
+            self._doc_bytes += len(blob)
+            self._doc_ends.append(self._doc_bytes)
+        self._docs.write(b"".join(blobs))
+        self._lengths.extend(lengths)
+
+    def copy_docs(self, segment: "Segment") -> None:
+        """Append a segment's stored documents, copying docs.bin in MERGE_COPY_BYTES blocks."""
+        with open(segment.path / "docs.bin", "rb") as f:
+            shutil.copyfileobj(f, self._docs, MERGE_COPY_BYTES)
+        self._doc_ends.frombytes((segment.doc_ends + np.uint64(self._doc_bytes)).tobytes())
+        self._doc_bytes += int(segment.doc_ends[-1]) if segment.docs else 0
+        self._lengths.frombytes(segment.lengths.tobytes())
+
+    def add_terms(self, terms: List[bytes], doc_freqs: np.ndarray, docs: np.ndarray, tfs: np.ndarray) -> None:
+        """Add terms (sorted, after any added before) with their concatenated postings."""
+        postings, lengths = encode_postings(doc_freqs, docs, tfs)
+        rows = np.empty((len(terms), 4), dtype=np.uint64)
+        rows[:, TERM_END] = self._term_bytes + np.cumsum([len(term) for term in terms])
+        rows[:, POSTINGS_OFFSET] = self._postings_bytes + np.cumsum(lengths) - lengths
+        rows[:, POSTINGS_LENGTH] = lengths
+        rows[:, DOC_FREQ] = doc_freqs
+        self._term_index.frombytes(rows.tobytes())
+        self._terms.write(b"".join(terms))
+        self._postings.write(postings)
+        self._term_bytes = int(rows[-1, TERM_END]) if len(terms) else self._term_bytes
+        self._postings_bytes += len(postings)
+
+    def finish(self, hashes: List[str]) -> None:
+        for f in (self._terms, self._postings, self._docs):
+            f.close()
+        with open(self.path / "terms.idx", "wb") as f:
+            self._term_index.tofile(f)
+        with open(self.path / "docs.idx", "wb") as f:
+            self._doc_ends.tofile(f)
+        with open(self.path / "lengths.bin", "wb") as f:
+            self._lengths.tofile(f)
+        meta = {"docs": len(self._lengths), "tokens": sum(self._lengths), "hashes": hashes}
+        (self.path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+class Segment:
+    """Read side of a segment: everything is memory-mapped, nothing is loaded up front."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.docs: int = meta["docs"]
+        self.tokens: int = meta["tokens"]
+        self.hashes: List[str] = meta["hashes"]
+        self._terms = _map_bytes(path / "terms.bin")
+        self._postings = _map_bytes(path / "postings.bin")
+        self._docs = _map_bytes(path / "docs.bin")
+        self._term_index = _map_array(path / "terms.idx", np.uint64).reshape(-1, 4)
+        self.doc_ends = _map_array(path / "docs.idx", np.uint64)
+        self.lengths = _map_array(path / "lengths.bin", np.uint32)
+
+    @property
+    def term_count(self) -> int:
+        return len(self._term_index)
+
+    def term(self, i: int) -> bytes:
+        start = int(self._term_index[i - 1, TERM_END]) if i else 0
+        return self._terms[start:int(self._term_index[i, TERM_END])]
+
+    def find(self, term: bytes) -> int:
+        """Row of term in the dictionary (binary search), or -1."""
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.term_count and self.term(lo) == term else -1
+
+    def iter_terms(self) -> Iterator[bytes]:
+        """Every term in dictionary order, read MERGE_BATCH_TERMS at a time (used by merges)."""
+        start = 0
+        for lo in range(0, self.term_count, MERGE_BATCH_TERMS):
+            for end in self._term_index[lo:lo + MERGE_BATCH_TERMS, TERM_END].tolist():
+                yield self._terms[start:end]
+                start = end
+
+    def doc_freq(self, i: int) -> int:
+        return int(self._term_index[i, DOC_FREQ])
+
+    def postings(self, lo: int, hi: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(doc freqs, doc ids, term frequencies) for dictionary rows lo..hi (default: just lo)."""
+        rows = self._term_index[lo:lo + 1 if hi is None else hi]
+        start = int(rows[0, POSTINGS_OFFSET])
+        end = int(rows[-1, POSTINGS_OFFSET] + rows[-1, POSTINGS_LENGTH])
+        doc_freqs = rows[:, DOC_FREQ].astype(np.int64)
+        return (doc_freqs, *decode_postings(self._postings[start:end], doc_freqs))
+
+    def doc(self, doc: int) -> Dict[str, Any]:
+        start = int(self.doc_ends[doc - 1]) if doc else 0
+        return json.loads(zlib.decompress(self._docs[start:int(self.doc_ends[doc])]))
+
+
+def _pack_doc(filename: str, page: int, text: str) -> bytes:
+    return zlib.compress(json.dumps({"filename": filename, "page": page, "text": text}).encode("utf-8"))
+
+
+def make_snippet(text: str, terms: List[str], size: int = SNIPPET_CHARS) -> str:
+    """About size characters of text around the first query term, cut at word boundaries."""
+    match = re.search(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\b", text, re.IGNORECASE) if terms else None
+    center = match.start() if match else 0
+    start = max(0, center - size // 3)
+    end = min(len(text), start + size)
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < center else start
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > center else end
+    snippet = " ".join(text[start:end].split())
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+
+class SearchIndex:
+    """BM25 full-text index of PDF pages stored as immutable on-disk segments.
+
+    Each add_document() call writes a new segment; segments of a similar size
+    are merged by a background thread. Queries read the memory-mapped
+    segments directly, so the index never has to fit in RAM.
+    """
+
+    def __init__(self, directory: str, merge_factor: int = SEARCH_MERGE_FACTOR):
+        if merge_factor < 2:
+            raise ValueError("merge_factor must be at least 2")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.merge_factor = merge_factor
+        self._lock = threading.Lock()
+        self._merging: set = set()
+        self._merge_thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        manifest = self.directory / "manifest.json"
+        state = json.loads(manifest.read_text(encoding="utf-8")) if manifest.exists() else {"segments": [], "next": 0}
+        self._next = state["next"]
+        self._segments = [Segment(self.directory / name) for name in state["segments"]]
+        self._hashes = {h for segment in self._segments for h in segment.hashes}
+        # Drop segments left behind by an interrupted write or merge
+        live = set(state["segments"])
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name not in live:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def __contains__(self, content_hash: str) -> bool:
+        return content_hash in self._hashes
+
+    @timed("search_index_add")
+    def add_document(self, filename: str, content_hash: str, pages: List[str]) -> bool:
+        """Index each non-empty page of a document; False if it was already indexed.
+
+        A document without any indexable text still gets a (page-less)
+        segment, so its hash is remembered across restarts.
+        """
+        with self._lock:
+            if content_hash in self._hashes:
+                return False
+            self._hashes.add(content_hash)
+            name = self._new_segment_name()
+
+        vocabulary: Dict[str, int] = {}
+        term_ids, doc_ids, tfs = array("I"), array("I"), array("I")
+        blobs: List[bytes] = []
+        lengths: List[int] = []
+        for number, text in enumerate(pages, start=1):
+            tokens = analyze(text)
+            if not tokens:
+                continue
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(len(blobs))
+                tfs.append(tf)
+            blobs.append(_pack_doc(filename, number, text))
+            lengths.append(len(tokens))
+
+        try:
+            writer = _SegmentWriter(self.directory / name)
+            writer.add_docs(blobs, lengths)
+            # Group postings by term in dictionary order; the stable sort keeps doc ids ascending
+            terms = sorted(vocabulary)
+            rank = np.empty(len(terms), dtype=np.int64)
+            rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+            keys = rank[np.frombuffer(term_ids, dtype=np.uint32)]
+            order = np.argsort(keys, kind="stable")
+            writer.add_terms([term.encode("utf-8") for term in terms], np.bincount(keys, minlength=len(terms)),
+                             np.frombuffer(doc_ids, dtype=np.uint32)[order], np.frombuffer(tfs, dtype=np.uint32)[order])
+            writer.finish([content_hash])
+        except BaseException:
+            with self._lock:
+                self._hashes.discard(content_hash)
+            raise
+
+        with self._lock:
+            self._segments.append(Segment(writer.path))
+            self._write_manifest()
+        self._maybe_merge()
+        return True
+
+    @timed("search_query")
+    def search(self, query: str, limit: int = 10) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return (number of matching pages, top `limit` hits by BM25 with snippets)."""
+        terms = list(dict.fromkeys(analyze(query)))
+        segments = list(self._segments)  # snapshot: merges swap the list, never mutate segments
+        total_docs = sum(segment.docs for segment in segments)
+        if not terms or not total_docs:
+            return 0, []
+        avgdl = sum(segment.tokens for segment in segments) / total_docs
+
+        # Look each term up once per segment and sum document frequencies for IDF
+        rows = [[segment.find(term.encode("utf-8")) for term in terms] for segment in segments]
+        doc_freq = [sum(segment.doc_freq(row[t]) for segment, row in zip(segments, rows) if row[t] >= 0)
+                    for t in range(len(terms))]
+        idf = [math.log(1 + (total_docs - df + 0.5) / (df + 0.5)) for df in doc_freq]
+
+        matched = 0
+        candidates: List[Tuple[float, int, int]] = []
+        for s, (segment, row) in enumerate(zip(segments, rows)):
+            if all(i < 0 for i in row):
+                continue
+            scores = np.zeros(segment.docs, dtype=np.float32)
+            for t, i in enumerate(row):
+                if i < 0:
+                    continue
+                _, docs, tfs = segment.postings(i)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.lengths[docs] / np.float32(avgdl))
+                scores[docs] += idf[t] * tfs * (BM25_K1 + 1) / (tfs + norm)
+            hits = np.flatnonzero(scores)
+            matched += len(hits)
+            if len(hits) > limit:
+                hits = hits[np.argpartition(scores[hits], -limit)[-limit:]]
+            candidates.extend((float(scores[d]), s, int(d)) for d in hits)
+
+        results = []
+        for score, s, d in heapq.nlargest(limit, candidates):
+            doc = segments[s].doc(d)
+            results.append({
+                "filename": doc["filename"],
+                "page": doc["page"],
+                "score": round(score, 4),
+                "snippet": make_snippet(doc["text"], terms),
+            })
+        return matched, results
+
+    def stats(self) -> Dict[str, Any]:
+        segments = list(self._segments)
+        return {
+            "documents": len(self._hashes),
+            "pages": sum(segment.docs for segment in segments),
+            "segments": len(segments),
+            "merging": bool(self._merging),
+        }
+
+    def wait_for_merges(self) -> None:
+        thread = self._merge_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self) -> None:
+        """Stop starting new merges and wait for a running one to finish."""
+        self._closed = True
+        self.wait_for_merges()
+
+    def _new_segment_name(self) -> str:
+        name = f"seg_{self._next:08d}"
+        self._next += 1
+        return name
+
+    def _write_manifest(self) -> None:
+        state = {"segments": [segment.name for segment in self._segments], "next": self._next}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.directory / "manifest.json")
+
+    def _pick_merge(self) -> List[Segment]:
+        """Oldest merge_factor segments of the smallest size tier that has that many."""
+        tiers: Dict[int, List[Segment]] = defaultdict(list)
+        for segment in self._segments:
+            if segment.name not in self._merging:
+                tiers[int(math.log(max(segment.docs, 1), self.merge_factor))].append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier][:self.merge_factor]
+        return []
+
+    def _maybe_merge(self) -> None:
+        with self._lock:
+            if self._closed or (self._merge_thread is not None and self._merge_thread.is_alive()):
+                return
+            if not self._pick_merge():
+                return
+            self._merge_thread = threading.Thread(target=self._merge_loop, name="search-index-merge", daemon=True)
+            self._merge_thread.start()
+
+    def _merge_loop(self) -> None:
+        while not self._closed:
+            with self._lock:
+                segments = self._pick_merge()
+                if not segments:
+                    return
+                self._merging.update(segment.name for segment in segments)
+                name = self._new_segment_name()
+            try:
+                try:
+                    merged = self._merge(segments, self.directory / name)
+                except BaseException:
+                    shutil.rmtree(self.directory / name, ignore_errors=True)
+                    raise
+                with self._lock:
+                    old = {segment.name for segment in segments}
+                    position = next(i for i, segment in enumerate(self._segments) if segment.name in old)
+                    rest = [segment for segment in self._segments if segment.name not in old]
+                    self._segments = rest[:position] + [merged] + rest[position:]
+                    self._write_manifest()
+            finally:
+                with self._lock:
+                    self._merging.difference_update(segment.name for segment in segments)
+            # Open searches may still hold the old mappings; unlinking is safe on POSIX
+            for segment in segments:
+                shutil.rmtree(segment.path, ignore_errors=True)
+
+    @staticmethod
+    def _merge(segments: List[Segment], path: Path) -> Segment:
+        """Write segments (in order) into one new segment at path."""
+        writer = _SegmentWriter(path)
+        bases = []
+        for segment in segments:
+            bases.append(writer.doc_count)
+            writer.copy_docs(segment)
+
+        # Stream the sorted term dictionaries through one k-way merge and write
+        # the result in batches of MERGE_BATCH_TERMS distinct terms; a term's
+        # rows in each segment are consecutive, so each segment's postings for
+        # a batch are decoded in one call
+        positions = [0] * len(segments)
+        batch: List[bytes] = []
+        batch_ids: List[List[int]] = [[] for _ in segments]
+
+        def flush() -> None:
+            keys, docs, tfs = [], [], []
+            for s, segment in enumerate(segments):
+                ids = batch_ids[s]
+                if not ids:
+                    continue
+                start = positions[s]
+                end = positions[s] = start + len(ids)
+                doc_freqs, segment_docs, segment_tfs = segment.postings(start, end)
+                keys.append(np.repeat(np.array(ids), doc_freqs))
+                docs.append(segment_docs + bases[s])
+                tfs.append(segment_tfs)
+                batch_ids[s] = []
+            # Segments are visited in order, so a stable sort keeps doc ids ascending
+            keys = np.concatenate(keys)
+            order = np.argsort(keys, kind="stable")
+            writer.add_terms(batch, np.bincount(keys, minlength=len(batch)),
+                             np.concatenate(docs)[order], np.concatenate(tfs)[order])
+            batch.clear()
+
+        streams = [zip(segment.iter_terms(), repeat(s)) for s, segment in enumerate(segments)]
+        for term, s in heapq.merge(*streams):
+            if not batch or batch[-1] != term:
+                if len(batch) == MERGE_BATCH_TERMS:
+                    flush()
+                batch.append(term)
+            batch_ids[s].append(len(batch) - 1)
+        if batch:
+            flush()
+        writer.finish([h for segment in segments for h in segment.hashes])
+        return Segment(path)
+
+search_index = SearchIndex(SEARCH_INDEX_DIR) if SEARCH_INDEX_DIR else None
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.metrics import timed
+
+CHUNK_SIZE = 1024 * 1024
+# Uploads larger than this are rejected while still streaming in
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+# Uploads up to this size are kept in memory and never touch the disk
+SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds its size limit."""
+
+
+class StoredUpload:
+    """A received upload: bytes in memory when small, a unique temp file otherwise.
+
+    Use as a context manager (or call cleanup()) so the temp file is always removed.
+    """
+
+    __slots__ = ("filename", "content_hash", "size", "data", "path")
+
+    def __init__(self, filename: str, content_hash: str, size: int,
+                 data: Optional[bytes] = None, path: Optional[Path] = None):
+        self.filename = filename
+        self.content_hash = content_hash
+        self.size = size
+        self.data = data
+        self.path = path
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """What PDFProcessor reads: the bytes themselves, or the temp file path."""
+        return self.data if self.data is not None else str(self.path)
+
+    def cleanup(self) -> None:
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "StoredUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cleanup()
+
+
+# Multipart bodies are parsed before handlers run, so this is the copy/hash/write cost
+@timed("upload_receive")
+async def receive_upload(file: UploadFile, directory: Path, max_bytes: Optional[int] = None,
+                         spool_max_bytes: Optional[int] = None) -> StoredUpload:
+    """Read an upload in chunks, hashing it and enforcing max_bytes in the same pass.
+
+    The first spool_max_bytes stay in memory; past that everything goes to a
+    uniquely named file in directory. Pass spool_max_bytes=0 to always write
+    the file (e.g. when it must outlive the request). Limits default to
+    MAX_UPLOAD_BYTES and SPOOL_MAX_BYTES.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    spool_max_bytes = SPOOL_MAX_BYTES if spool_max_bytes is None else spool_max_bytes
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+    path: Optional[Path] = None
+    out = None
+    try:
+        if spool_max_bytes <= 0:
+            path, out = _open_temp_file(directory, file.filename)
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            if out is None and size <= spool_max_bytes:
+                buffer += chunk
+                continue
+            if out is None:
+                # Spool limit crossed: move what we have to disk in the same write
+                path, out = _open_temp_file(directory, file.filename)
+                chunk = bytes(buffer) + chunk
+                buffer = bytearray()
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        if out is not None:
+            out.close()
+        if path is not None:
+            path.unlink(missing_ok=True)
+        raise
+
+    if out is None:
+        return StoredUpload(file.filename, digest.hexdigest(), size, data=bytes(buffer))
+    out.close()
+    return StoredUpload(file.filename, digest.hexdigest(), size, path=path)
+
+
+def _open_temp_file(directory: Path, filename: str):
+    """Create a uniquely named file (keeping the original name as a suffix) for writing."""
+    fd, name = tempfile.mkstemp(dir=directory, prefix="upload-", suffix=f"_{Path(filename).name}")
+    return Path(name), os.fdopen(fd, "wb")
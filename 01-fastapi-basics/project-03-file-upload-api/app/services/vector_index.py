@@ -0,0 +1,317 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import timed
+from app.services.search_index import analyze
+
+# Chunk embeddings for /similar; disabled unless a directory is given
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "")
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "512"))
+CHUNK_WORDS = int(os.getenv("VECTOR_CHUNK_WORDS", "200"))
+CHUNK_OVERLAP = int(os.getenv("VECTOR_CHUNK_OVERLAP", "50"))
+# The IVF quantizer is trained once this many chunks exist, and retrained
+# in the background when untrained rows exceed RETRAIN_FRACTION of the trained ones
+IVF_MIN_ROWS = int(os.getenv("VECTOR_IVF_MIN_ROWS", "10000"))
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "8"))
+RETRAIN_FRACTION = 0.25
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_SAMPLE = 50000
+# Rows scored per matrix multiply during exact search (bounds memory per query batch)
+SEARCH_BLOCK_ROWS = 65536
+
+
+def chunk_text(text: str, chunk_words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into windows of chunk_words words, consecutive windows sharing overlap words."""
+    if not 0 <= overlap < chunk_words:
+        raise ValueError("overlap must be smaller than chunk_words")
+    words = text.split()
+    if not words:
+        return []
+    step = chunk_words - overlap
+    return [" ".join(words[start:start + chunk_words]) for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of words and word bigrams.
+
+    Counts are damped with log1p and rows are L2-normalized, so a dot
+    product is the cosine similarity.
+    """
+
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = analyze(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                continue
+            # crc32 is stable across processes, unlike hash(); its top bit picks the sign
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32,
+                                 count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            counts = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+            vector = np.sign(counts) * np.log1p(np.abs(counts))
+            norm = np.linalg.norm(vector)
+            if norm:
+                out[row] = vector / norm
+        return out
+
+
+def top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best k (ids, scores) per row of scores, highest first."""
+    if scores.shape[1] > k:
+        part = np.argpartition(scores, -k, axis=1)[:, -k:]
+        scores = np.take_along_axis(scores, part, axis=1)
+        ids = np.take_along_axis(ids, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int,
+                 block_rows: int = SEARCH_BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """Brute-force top-k by dot product for a batch of queries, one block of rows at a time."""
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows])
+        scores = queries @ block.T
+        ids = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        best_ids, best_scores = top_k(np.hstack([best_scores, scores]), np.hstack([best_ids, ids]), k)
+    return best_ids, best_scores
+
+
+class IVFQuantizer:
+    """Inverted-file coarse quantizer: k-means centroids plus each cluster's rows.
+
+    Queries score only the rows of the nprobe clusters whose centroids are
+    closest, so the work grows with nprobe/nlist instead of the matrix size.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, trained_rows: int):
+        self.centroids = centroids
+        self.order = order  # row ids grouped by cluster
+        self.offsets = offsets  # cluster i owns order[offsets[i]:offsets[i + 1]]
+        self.trained_rows = trained_rows
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: Optional[int] = None, seed: int = 0) -> "IVFQuantizer":
+        """Spherical k-means on a sample of rows, then assign every row to its nearest centroid."""
+        rows = len(vectors)
+        nlist = min(rows, nlist or max(1, int(math.sqrt(rows))))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, min(rows, KMEANS_MAX_SAMPLE), replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their old centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+
+        labels = np.concatenate([np.argmax(np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS]) @ centroids.T, axis=1)
+                                 for start in range(0, rows, SEARCH_BLOCK_ROWS)])
+        order = np.argsort(labels, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+        return cls(centroids, order, offsets, rows)
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (ids, scores) for one query; rows added after training are always scanned."""
+        nprobe = min(nprobe, self.nlist)
+        probes = np.argpartition(self.centroids @ query, -nprobe)[-nprobe:]
+        candidates = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes]
+        candidates.append(np.arange(self.trained_rows, len(vectors)))
+        ids = np.sort(np.concatenate(candidates))  # ascending ids keep memory-mapped reads sequential
+        scores = np.asarray(vectors[ids]) @ query
+        best_ids, best_scores = top_k(scores[None, :], ids[None, :], k)
+        return best_ids[0], best_scores[0]
+
+    def save(self, path: Path) -> None:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                     trained_rows=self.trained_rows)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFQuantizer":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"], int(data["trained_rows"]))
+
+
+class VectorIndex:
+    """Append-only store of chunk embeddings with exact and IVF top-k search.
+
+    vectors.f32 is a raw float32 matrix read through np.memmap; chunks.jsonl
+    holds one line of metadata per row, with line end offsets in chunks.idx;
+    documents.jsonl is written last for each upload and marks which rows are
+    complete.
+    """
+
+    def __init__(self, directory: str, embedder: Optional[HashingEmbedder] = None,
+                 ivf_min_rows: int = IVF_MIN_ROWS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.ivf_min_rows = ivf_min_rows
+        self._lock = threading.Lock()
+        self._train_thread: Optional[threading.Thread] = None
+        self._vectors_path = self.directory / "vectors.f32"
+        self._chunks_path = self.directory / "chunks.jsonl"
+        self._chunk_index_path = self.directory / "chunks.idx"
+        self._documents_path = self.directory / "documents.jsonl"
+        self._ivf_path = self.directory / "ivf.npz"
+
+        self._hashes = set()
+        rows, chunks_end = 0, 0
+        if self._documents_path.exists():
+            with open(self._documents_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        document = json.loads(line)
+                    except ValueError:
+                        break  # torn write of the last line
+                    self._hashes.add(document["hash"])
+                    rows, chunks_end = document["first_row"] + document["rows"], document["chunks_end"]
+        # Drop rows written by an upload that never committed
+        for path, size in ((self._vectors_path, rows * self.dim * 4), (self._chunks_path, chunks_end),
+                           (self._chunk_index_path, rows * 8)):
+            with open(path, "ab") as f:
+                f.truncate(size)
+        self._chunk_ends = array("Q")
+        with open(self._chunk_index_path, "rb") as f:
+            self._chunk_ends.fromfile(f, rows)
+        self._vectors = self._map(rows)
+        self._ivf: Optional[IVFQuantizer] = None
+        if self._ivf_path.exists():
+            ivf = IVFQuantizer.load(self._ivf_path)
+            if ivf.trained_rows <= rows and ivf.centroids.shape[1] == self.dim:
+                self._ivf = ivf
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def __contains__(self, content_hash: str) -> bool:
+        return content_hash in self._hashes
+
+    def _map(self, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    @timed("vector_index_add")
+    def add_document(self, filename: str, content_hash: str, text: str) -> int:
+        """Chunk, embed and append a document; returns the number of chunks added.
+
+        A document without text is still recorded (with no rows), so it
+        counts as indexed after a restart.
+        """
+        if content_hash in self._hashes:
+            return 0
+        chunks = chunk_text(text)
+        vectors = self.embedder.embed(chunks)
+
+        with self._lock:
+            if content_hash in self._hashes:
+                return 0
+            first_row = len(self._vectors)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            lines = [json.dumps({"filename": filename, "chunk": i, "text": chunk}) + "\n"
+                     for i, chunk in enumerate(chunks)]
+            ends = array("Q")
+            end = self._chunk_ends[-1] if self._chunk_ends else 0
+            with open(self._chunks_path, "ab") as f:
+                for line in lines:
+                    data = line.encode("utf-8")
+                    f.write(data)
+                    end += len(data)
+                    ends.append(end)
+            with open(self._chunk_index_path, "ab") as f:
+                ends.tofile(f)
+            self._chunk_ends.extend(ends)
+            document = {"hash": content_hash, "filename": filename, "first_row": first_row,
+                        "rows": len(chunks), "chunks_end": end}
+            with open(self._documents_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(document) + "\n")
+            self._hashes.add(content_hash)
+            self._vectors = self._map(first_row + len(chunks))
+        self._maybe_train()
+        return len(chunks)
+
+    @timed("similar_query")
+    def search(self, query: str, k: int = 10, mode: str = "ivf",
+               nprobe: int = IVF_NPROBE) -> Tuple[str, List[Dict[str, Any]]]:
+        """Return (mode actually used, top-k chunks by cosine similarity).
+
+        "ivf" falls back to an exact scan until the quantizer has been trained.
+        """
+        vectors, ivf = self._vectors, self._ivf  # snapshot; appends swap in a new mapping
+        mode = "ivf" if mode == "ivf" and ivf is not None else "exact"
+        query_vector = self.embedder.embed([query])[0]
+        if not len(vectors) or not query_vector.any():
+            return mode, []
+        if mode == "ivf":
+            ids, scores = ivf.search(vectors, query_vector, k, nprobe)
+        else:
+            ids, scores = (a[0] for a in exact_search(vectors, query_vector[None, :], k))
+        # Chunks sharing no hashed feature with the query score 0 and are left out
+        return mode, [dict(self.chunk(int(i)), score=round(float(s), 4)) for i, s in zip(ids, scores) if s > 0]
+
+    def chunk(self, row: int) -> Dict[str, Any]:
+        start = self._chunk_ends[row - 1] if row else 0
+        with open(self._chunks_path, "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(self._chunk_ends[row] - start))
+
+    def train(self, nlist: Optional[int] = None) -> None:
+        """(Re)build the IVF quantizer over every row stored so far."""
+        ivf = IVFQuantizer.train(self._vectors, nlist)
+        ivf.save(self._ivf_path)
+        self._ivf = ivf
+
+    def stats(self) -> Dict[str, Any]:
+        ivf = self._ivf
+        return {
+            "documents": len(self._hashes),
+            "chunks": len(self._vectors),
+            "dim": self.dim,
+            "ivf_lists": ivf.nlist if ivf is not None else 0,
+            "ivf_trained_rows": ivf.trained_rows if ivf is not None else 0,
+        }
+
+    def wait_for_training(self) -> None:
+        thread = self._train_thread
+        if thread is not None:
+            thread.join()
+
+    def _maybe_train(self) -> None:
+        rows = len(self._vectors)
+        trained = self._ivf.trained_rows if self._ivf is not None else 0
+        if rows < self.ivf_min_rows or rows - trained <= trained * RETRAIN_FRACTION:
+            return
+        with self._lock:
+            if self._train_thread is not None and self._train_thread.is_alive():
+                return
+            self._train_thread = threading.Thread(target=self.train, name="vector-index-train", daemon=True)
+            self._train_thread.start()
+
+
+vector_index = VectorIndex(VECTOR_INDEX_DIR) if VECTOR_INDEX_DIR else None
@@ -0,0 +1,62 @@
+"""Requests/second and latency percentiles of PDF uploads under concurrent load.
+
+Each scenario uploads synthetic PDFs with a given number of pages of
+--words-per-page words. The result cache is disabled unless --cached is
+given, so every request extracts and analyses its PDF. Runs in-process by
+default, or against a local uvicorn:
+
+    python -m benchmarks.load --pages 1 20 --concurrency 8
+    python -m benchmarks.load --mode uvicorn --workers 2 --concurrency 16
+    PDF_EXECUTION_MODE=inline python -m benchmarks.load
+    python -m benchmarks.load --save-baseline    # accept the current numbers
+
+Exits with status 1 when a result regresses against benchmarks/baselines/load.json.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from benchmarks.loadgen import Scenario, add_load_arguments, report, run_suite, synthetic_text
+from benchmarks.pdfs import make_pdf
+
+# Distinct PDFs per scenario, sent round-robin
+PDFS_PER_SCENARIO = 8
+
+
+def make_document(pages, words_per_page, seed):
+    return make_pdf([synthetic_text(words_per_page, seed * 1000 + page) for page in range(pages)])
+
+
+def build_scenarios(page_counts, words_per_page):
+    scenarios = []
+    for pages in page_counts:
+        pdfs = [make_document(pages, words_per_page, seed) for seed in range(PDFS_PER_SCENARIO)]
+        kib = sum(map(len, pdfs)) // len(pdfs) // 1024
+        scenarios.append(Scenario(f"POST /upload/ {pages}p {kib}KiB", [
+            {"method": "POST", "url": "/upload/", "files": {"file": (f"bench-{i}.pdf", pdf, "application/pdf")}}
+            for i, pdf in enumerate(pdfs)]))
+        scenarios.append(Scenario(f"POST /upload/batch 4x{pages}p", [
+            {"method": "POST", "url": "/upload/batch",
+             "files": [("files", (f"bench-{i}-{j}.pdf", pdfs[(i + j) % len(pdfs)], "application/pdf"))
+                       for j in range(4)]}
+            for i in range(len(pdfs))]))
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 20], help="Pages per PDF")
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--cached", action="store_true", help="Keep the result cache enabled")
+    add_load_arguments(parser, Path(__file__).parent / "baselines" / "load.json")
+    args = parser.parse_args()
+    if not args.cached:
+        # Read when the app is imported, in this process or the uvicorn server
+        os.environ["RESULT_CACHE_MAX_BYTES"] = "0"
+    results = run_suite(build_scenarios(args.pages, args.words_per_page), args, "app.main:app")
+    sys.exit(report(results, args))
+
+
+if __name__ == "__main__":
+    main()
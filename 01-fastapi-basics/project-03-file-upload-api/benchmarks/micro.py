@@ -0,0 +1,44 @@
+"""Calls/second and MB/s of PDF text extraction and keyword processing across input sizes.
+
+Calls PDFProcessor directly, in this process, on synthetic texts and on
+PDFs built from them:
+
+    python -m benchmarks.micro --sizes 100 10000 200000
+    python -m benchmarks.micro --save-baseline
+
+Exits with status 1 when a result regresses against benchmarks/baselines/micro.json.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from app.services.pdf_processor import PDFProcessor, preload
+from benchmarks.loadgen import add_baseline_arguments, measure, report, synthetic_text
+from benchmarks.pdfs import make_pdf
+
+WORDS_PER_PAGE = 400
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 200000], help="Words per text")
+    parser.add_argument("--rounds", type=int, default=20)
+    add_baseline_arguments(parser, Path(__file__).parent / "baselines" / "micro.json")
+    args = parser.parse_args()
+
+    preload()
+    results = {}
+    for words in args.sizes:
+        pages = [synthetic_text(min(WORDS_PER_PAGE, words - start), start)
+                 for start in range(0, words, WORDS_PER_PAGE)]
+        text = "\n".join(pages)
+        pdf = make_pdf(pages)
+        results[f"process_text {words}w"] = measure(
+            PDFProcessor.process_text, text, rounds=args.rounds, bytes_per_call=len(text.encode("utf-8")))
+        results[f"extract_pages {words}w {len(pages)}p"] = measure(
+            PDFProcessor.extract_pages, pdf, rounds=args.rounds, bytes_per_call=len(pdf))
+    sys.exit(report(results, args))
+
+
+if __name__ == "__main__":
+    main()
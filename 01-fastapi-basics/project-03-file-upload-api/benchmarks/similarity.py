@@ -0,0 +1,80 @@
+"""Compare recall@k and queries/second for exact and IVF similarity search.
+
+Embeds a synthetic topic corpus with the app's HashingEmbedder, stores it as
+a memory-mapped float32 matrix and treats exact search as ground truth:
+
+    python -m benchmarks.similarity --chunks 50000 --queries 200
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.vector_index import HashingEmbedder, IVFQuantizer, exact_search
+
+
+def make_corpus(count, words_per_chunk=150, topics=200, vocab=20000, seed=0):
+    """Chunks whose words come mostly from one of `topics` overlapping word distributions."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocab)])
+    zipf = 1 / np.arange(1, 501)
+    zipf /= zipf.sum()
+    topic_words = [rng.choice(vocab, 500, replace=False) for _ in range(topics)]
+    chunks = []
+    for topic in rng.integers(topics, size=count):
+        own = topic_words[topic][rng.choice(500, int(words_per_chunk * 0.7), p=zipf)]
+        noise = rng.integers(vocab, size=words_per_chunk - len(own))
+        chunks.append(" ".join(words[np.concatenate([own, noise])]))
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (default: sqrt(chunks))")
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder()
+    texts = make_corpus(args.chunks + args.queries)
+    start = time.perf_counter()
+    matrix = embedder.embed(texts[:args.chunks])
+    # Queries are the first 40 words of held-out chunks
+    queries = embedder.embed([" ".join(text.split()[:40]) for text in texts[args.chunks:]])
+    print(f"embedded {len(texts):,} chunks in {time.perf_counter() - start:.1f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "vectors.f32"
+        matrix.tofile(path)
+        vectors = np.memmap(path, dtype=np.float32, mode="r", shape=matrix.shape)
+
+        start = time.perf_counter()
+        truth, _ = exact_search(vectors, queries, args.k)
+        batched = time.perf_counter() - start
+        start = time.perf_counter()
+        for query in queries:
+            exact_search(vectors, query[None, :], args.k)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ivf = IVFQuantizer.train(vectors, args.nlist or None)
+        print(f"trained IVF with {ivf.nlist} lists in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'mode':<22} {'recall@' + str(args.k):>10} {'queries/s':>10}")
+        print(f"{'exact (batched)':<22} {1.0:>10.3f} {len(queries) / batched:>10,.0f}")
+        print(f"{'exact':<22} {1.0:>10.3f} {len(queries) / single:>10,.0f}")
+        for nprobe in (1, 2, 4, 8, 16, 32):
+            if nprobe > ivf.nlist:
+                break
+            start = time.perf_counter()
+            found = [ivf.search(vectors, query, args.k, nprobe)[0] for query in queries]
+            elapsed = time.perf_counter() - start
+            recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+            print(f"{'ivf nprobe=' + str(nprobe):<22} {recall:>10.3f} {len(queries) / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
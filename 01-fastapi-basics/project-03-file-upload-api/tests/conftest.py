@@ -0,0 +1,11 @@
+import pytest
+
+from benchmarks.pdfs import make_pdf
+
+
+@pytest.fixture
+def pdf_file(tmp_path):
+    """Write a small two-page PDF to disk and return its path."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["Invoice for consulting services", "Payment due within thirty days"]))
+    return path
@@ -0,0 +1,42 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import upload
+from app.services import executor
+from app.services.pdf_processor import open_pdf
+from app.services.result_cache import ResultCache
+from benchmarks.pdfs import make_pdf
+
+
+def fake_process_file(source, top_n=5):
+    with open_pdf(source) as stream:
+        if stream.read(4) != b"%PDF":
+            raise ValueError("Error extracting text: not a PDF")
+    return "some text", 2, ["some", "text"]
+
+
+def test_batch_streams_one_line_per_file(monkeypatch):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "thread")
+    monkeypatch.setattr(upload.PDFProcessor, "process_file", fake_process_file)
+    monkeypatch.setattr(upload, "result_cache", ResultCache(max_bytes=1024))
+    client = TestClient(app)
+
+    files = [
+        ("files", ("a.pdf", make_pdf(["first"]), "application/pdf")),
+        ("files", ("a.pdf", make_pdf(["second"]), "application/pdf")),
+        ("files", ("broken.pdf", b"garbage", "application/pdf")),
+        ("files", ("notes.txt", b"hello", "text/plain")),
+    ]
+    response = client.post("/upload/batch", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 4
+    assert sum(1 for line in lines if "word_count" in line) == 2
+    errors = {line["filename"]: line["detail"] for line in lines if "detail" in line}
+    assert errors["notes.txt"] == "Only PDF files are allowed"
+    assert "not a PDF" in errors["broken.pdf"]
+    assert list(upload.UPLOAD_DIR.glob("*_a.pdf")) == []
@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import UploadResponse
+from app.routers import upload
+from app.services.jobs import DONE, FAILED, JobQueue, JobStore
+from benchmarks.pdfs import make_pdf
+
+
+async def fake_handler(filename, file_path, content_hash):
+    file_path.unlink(missing_ok=True)
+    if filename.startswith("bad"):
+        raise ValueError("Error extracting text: broken")
+    return UploadResponse(filename=filename, word_count=1, top_keywords=["job"])
+
+
+def post_job(client, filename, priority=0):
+    files = {"file": (filename, make_pdf(["job"]), "application/pdf")}
+    return client.post(f"/upload/jobs?priority={priority}", files=files)
+
+
+def wait_for(client, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/upload/jobs/{job_id}").json()
+        if job["status"] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_lifecycle(monkeypatch):
+    monkeypatch.setattr(upload, "job_queue", JobQueue(JobStore(":memory:"), fake_handler))
+    with TestClient(app) as client:
+        response = post_job(client, "report.pdf", priority=5)
+        assert response.status_code == 202
+        job = wait_for(client, response.json()["id"])
+        assert job["status"] == DONE
+        assert job["result"]["top_keywords"] == ["job"]
+
+        failed = wait_for(client, post_job(client, "bad.pdf").json()["id"])
+        assert failed["status"] == FAILED
+        assert "broken" in failed["error"]
+
+        assert client.get("/upload/jobs/missing").status_code == 404
+
+
+def test_queue_full_rejected_with_retry_after(monkeypatch, tmp_path):
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(upload, "job_queue", JobQueue(JobStore(":memory:"), fake_handler, workers=0, max_pending=1))
+    with TestClient(app) as client:
+        assert post_job(client, "a.pdf").status_code == 202
+        response = post_job(client, "b.pdf")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"]
+        assert [path.name.endswith("_a.pdf") for path in tmp_path.iterdir()] == [True]
+
+
+def test_higher_priority_runs_first(tmp_path):
+    order = []
+
+    async def handler(filename, file_path, content_hash):
+        order.append(filename)
+        if filename == "busy":
+            await release.wait()
+        return UploadResponse(filename=filename, word_count=0, top_keywords=[])
+
+    async def run():
+        queue = JobQueue(JobStore(":memory:"), handler, workers=1)
+        queue.start()
+        await queue.submit("busy", tmp_path / "busy", "hash")  # occupies the only worker
+        for name, priority in [("low", 0), ("high", 9), ("mid", 5), ("low2", 0)]:
+            await queue.submit(name, tmp_path / name, "hash", priority)
+        release.set()
+        await queue.join()
+        await queue.stop()
+
+    release = asyncio.Event()
+    asyncio.run(run())
+    assert order == ["busy", "high", "mid", "low", "low2"]
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    kept, lost = tmp_path / "kept.pdf", tmp_path / "lost.pdf"
+    kept.write_bytes(b"%PDF")
+    store = JobStore(db)
+    store.create("kept", "kept.pdf", str(kept), "h1", 0)
+    store.create("lost", "lost.pdf", str(lost), "h2", 0)
+    store.close()
+
+    async def run():
+        queue = JobQueue(JobStore(db), fake_handler, workers=1)
+        queue.start()
+        await queue.join()
+        await queue.stop()
+        return queue.store
+
+    store = asyncio.run(run())
+    assert store.get("kept")["status"] == DONE
+    assert store.get("lost")["status"] == FAILED
+    assert store.unfinished() == []
+
+
+def test_worker_survives_a_job_missing_from_the_store(tmp_path):
+    class ForgetfulStore(JobStore):
+        def get(self, job_id):
+            job = super().get(job_id)
+            return None if job and job["filename"] == "gone.pdf" else job
+
+    async def run():
+        queue = JobQueue(ForgetfulStore(":memory:"), fake_handler, workers=1)
+        queue.start()
+        await queue.submit("gone.pdf", tmp_path / "gone.pdf", "h1")
+        kept = await queue.submit("kept.pdf", tmp_path / "kept.pdf", "h2")
+        await queue.join()
+        await queue.stop()
+        return await queue.get(kept)
+
+    assert asyncio.run(run())["status"] == DONE
+
+
+def test_sweep_deletes_only_old_finished_jobs(monkeypatch, tmp_path):
+    store = JobStore(":memory:")
+    for job_id, status, now in [("old", DONE, 1000.0), ("failed", FAILED, 1000.0),
+                                ("recent", DONE, 1100.0), ("queued", None, 1000.0)]:
+        monkeypatch.setattr(time, "time", lambda: now)
+        store.create(job_id, f"{job_id}.pdf", str(tmp_path / job_id), job_id, 0)
+        if status:
+            store.set_status(job_id, status)
+    monkeypatch.setattr(time, "time", lambda: 1100.0)
+
+    async def run():
+        return await JobQueue(store, fake_handler, workers=0, retention=50).sweep()
+
+    assert asyncio.run(run()) == 2
+    assert [store.get(job_id) is None for job_id in ("old", "failed", "recent", "queued")] == [
+        True, True, False, False]
+
+
+def test_store_creates_database_on_first_use(tmp_path):
+    db = tmp_path / "jobs" / "jobs.sqlite3"
+    store = JobStore(str(db))
+    assert not db.parent.exists()
+    assert store.get("missing") is None
+    assert db.exists()
+    store.close()
@@ -0,0 +1,131 @@
+import re
+from collections import Counter
+
+import pytest
+
+from app.services.keywords import (TOKEN_PATTERN, KeywordEngine, english_stop_words, iter_text_chunks,
+                                   parse_ngram_range)
+
+STOP_WORDS = frozenset({"the", "a", "is", "of", "and", "it", "to", "in", "for", "not"})
+
+SAMPLES = [
+    "The quick brown fox jumps over the lazy dog. The dog didn't care; it's a lazy dog, after all! "
+    "Foxes can't resist dogs... or can they?",
+    "Invoice #1234 - payment of $3,500.00 is due within 30 days. Contact billing@example.com "
+    "(or call 555-0100) for questions. We'll send a reminder about the invoice and the payment.",
+    "FastAPI is a modern, fast (high-performance), web framework for building APIs with Python "
+    "based on standard Python type hints. State-of-the-art tools aren't cheap, said O'Neil.",
+    "You cannot skip the docs at https://example.com/docs/setup?page=2 today. Read them and/or "
+    "ask at 10:30, or you're gonna have a bad time with the setup. The docs cannot help you then!",
+]
+
+
+def test_counts_tokens_and_ranks_keywords():
+    engine = KeywordEngine(stop_words=STOP_WORDS)
+    word_count, keywords = engine.extract("The cat and the hat. The cat sat!", top_n=2)
+    assert word_count == 10  # 8 words + 2 punctuation marks
+    assert keywords == ["cat", "hat"]
+
+
+def test_contractions_split_like_treebank():
+    engine = KeywordEngine(stop_words=STOP_WORDS)
+    word_count, _ = engine.extract("Don't stop. It's fine")
+    assert word_count == 7  # do, n't, stop, ., it, 's, fine
+
+
+# Expected tokens are NLTK word_tokenize output for the same (lowercased) text
+@pytest.mark.parametrize("text, tokens", [
+    ("you cannot go", ["you", "can", "not", "go"]),
+    ("gonna wanna 'tis", ["gon", "na", "wan", "na", "'t", "is"]),
+    ("see https://example.com/a/b?x=1 now", ["see", "https", ":", "//example.com/a/b", "?", "x=1", "now"]),
+    ("the u.s.a. and e.g. this", ["the", "u.s.a.", "and", "e.g.", "this"]),
+    ("made in the u.s.a.", ["made", "in", "the", "u.s.a", "."]),
+    ("a/b at 10:30, c++", ["a/b", "at", "10:30", ",", "c++"]),
+])
+def test_tokens_match_treebank_on_special_cases(text, tokens):
+    assert TOKEN_PATTERN.findall(text) == tokens
+
+
+def test_cannot_is_not_a_keyword():
+    _, keywords = KeywordEngine().extract("We cannot ship. Cannot, cannot! Shipping soon.")
+    assert keywords == ["ship", "shipping", "soon"]
+
+
+def test_chunked_input_matches_whole_text():
+    engine = KeywordEngine(stop_words=STOP_WORDS)
+    text = " ".join(SAMPLES) * 50
+    chunks = list(iter_text_chunks(text, chunk_chars=97))
+    assert len(chunks) > 1
+    assert engine.extract(chunks, top_n=10) == engine.extract(text, top_n=10)
+
+
+def test_keyphrase_mode_counts_runs_between_stopwords():
+    engine = KeywordEngine(stop_words=STOP_WORDS, ngram_range=(2, 2))
+    _, counts = engine.count(["machine learning is fun. machine learning models, learning models"])
+    assert counts["machine learning"] == 2
+    assert counts["learning models"] == 2
+    assert "learning fun" not in counts  # broken by a stopword
+    assert "models learning" not in counts  # broken by punctuation
+
+
+def test_stopwords_load_from_bundled_data():
+    stop_words = english_stop_words()
+    assert len(stop_words) == 179
+    assert {"the", "don't", "wouldn't"} <= stop_words
+
+
+def test_invalid_ngram_range():
+    with pytest.raises(ValueError):
+        KeywordEngine(ngram_range=(2, 1))
+
+
+def test_parse_ngram_range():
+    assert parse_ngram_range("1,3") == (1, 3)
+    assert parse_ngram_range("2") == (2, 2)
+    for value in ("3,1", "0", "1,2,3", "two", ""):
+        with pytest.raises(ValueError, match="KEYWORD_NGRAM_RANGE"):
+            parse_ngram_range(value)
+
+
+def nltk_reference(text, top_n=5):
+    """The original NLTK implementation of PDFProcessor.process_text.
+
+    Runs without NLTK's data packages: when punkt is missing, sentences are
+    split after ". ", "! " and "? " (which is what punkt does on SAMPLES),
+    and the bundled copy of NLTK's stopword list is used throughout.
+    """
+    from nltk.tokenize import word_tokenize
+
+    text = text.lower()
+    if nltk_data_available("tokenizers/punkt"):
+        tokens = word_tokenize(text)
+    else:
+        tokens = [token for sentence in re.split(r"(?<=[.!?])\s+", text)
+                  for token in word_tokenize(sentence, preserve_line=True)]
+    stop_words = english_stop_words()
+    filtered_tokens = [word for word in tokens if word.isalpha() and word not in stop_words]
+    return len(tokens), [word for word, _ in Counter(filtered_tokens).most_common(top_n)]
+
+
+def nltk_data_available(resource):
+    try:
+        import nltk
+        nltk.data.find(resource)
+    except (ImportError, LookupError):
+        return False
+    return True
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_parity_with_nltk(text):
+    pytest.importorskip("nltk")
+    expected_count, expected_keywords = nltk_reference(text)
+    word_count, keywords = KeywordEngine().extract(text)
+    assert keywords == expected_keywords
+    assert abs(word_count - expected_count) <= max(1, expected_count // 50)
+
+
+@pytest.mark.skipif(not nltk_data_available("corpora/stopwords"), reason="NLTK stopwords data not installed")
+def test_bundled_stopwords_match_nltk():
+    from nltk.corpus import stopwords
+    assert english_stop_words() == frozenset(stopwords.words('english'))
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import Histogram, Registry, capture_stages, instrument, replay_stages, stage_timer
+from app.routers import upload
+from app.services import executor
+from app.services.result_cache import ResultCache
+from benchmarks.pdfs import make_pdf
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/a\\"b"} 4' in lines
+
+
+def test_captured_stages_are_replayed():
+    with capture_stages() as stages:
+        with stage_timer("unit_test_stage"):
+            pass
+    assert [name for name, _ in stages] == ["unit_test_stage"]
+    replay_stages(stages)
+    client = TestClient(app)
+    assert 'app_stage_duration_seconds_count{stage="unit_test_stage"} 1' in client.get("/metrics").text
+
+
+def test_route_template_ignores_converted_values():
+    demo = FastAPI()
+    instrument(demo)
+
+    @demo.get("/demo/items/{item_id:int}/{name}")
+    async def item(item_id: int, name: str):
+        return {}
+
+    client = TestClient(demo)
+    assert client.get("/demo/items/007/7").status_code == 200
+    text = client.get("/metrics").text
+    assert 'route="/demo/items/{item_id}/{name}",status="200"' in text
+    assert "/demo/items/007" not in text
+
+
+@pytest.mark.parametrize("mode", ["inline", "process"])
+def test_metrics_cover_routes_and_pdf_stages(monkeypatch, mode):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", mode)
+    monkeypatch.setattr(upload, "result_cache", ResultCache(max_bytes=1024))
+    client = TestClient(app)
+    try:
+        pdf = make_pdf([f"metrics in {mode} mode"])
+        assert client.post("/upload/", files={"file": ("m.pdf", pdf, "application/pdf")}).status_code == 200
+        assert client.get("/upload/jobs/missing").status_code == 404
+        assert client.get("/no/such/page").status_code == 404
+    finally:
+        executor.shutdown_executor()
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/upload/",status="200"}' in text
+    # Route templates, not raw paths, keep label cardinality bounded
+    assert 'route="/upload/jobs/{job_id}",status="404"' in text
+    assert 'route="unmatched",status="404"' in text
+    assert "/no/such/page" not in text
+    assert 'http_requests_in_flight{method="GET"} 1' in text
+    assert 'http_request_size_bytes_bucket{method="POST",route="/upload/"' in text
+    for stage in ("upload_receive", "pdf_extract_text", "pdf_process_text"):
+        assert f'app_stage_duration_seconds_count{{stage="{stage}"}}' in text
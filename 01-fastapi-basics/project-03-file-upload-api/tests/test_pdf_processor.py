@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services import executor
+from app.services.pdf_processor import PDFProcessor
+
+
+def test_iter_pages_yields_one_string_per_page(pdf_file):
+    pages = list(PDFProcessor.iter_pages(str(pdf_file)))
+    assert len(pages) == 2
+    assert "consulting" in pages[0]
+    assert "thirty" in pages[1]
+
+
+def test_extract_text_joins_pages(pdf_file):
+    text = PDFProcessor.extract_text(str(pdf_file))
+    assert text.index("consulting") < text.index("thirty")
+    assert "\n" in text
+
+
+def test_extract_text_truncates_long_pages(pdf_file):
+    pages = list(PDFProcessor.iter_pages(str(pdf_file), max_page_chars=7))
+    assert all(len(page) <= 7 for page in pages)
+
+
+def test_extract_text_invalid_pdf(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    with pytest.raises(ValueError):
+        PDFProcessor.extract_text(str(path))
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_run_blocking_modes(monkeypatch, pdf_file, mode):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", mode)
+    try:
+        text = asyncio.run(executor.run_blocking(PDFProcessor.extract_text, str(pdf_file)))
+    finally:
+        executor.shutdown_executor()
+    assert "consulting" in text
+
+
+def test_bytes_and_mapped_file_give_same_text(pdf_file):
+    assert PDFProcessor.extract_text(pdf_file.read_bytes()) == PDFProcessor.extract_text(str(pdf_file))
+
+
+def test_extract_text_empty_file(tmp_path):
+    path = tmp_path / "empty.pdf"
+    path.touch()
+    with pytest.raises(ValueError):
+        PDFProcessor.extract_text(str(path))
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import upload
+from app.services import executor, result_cache
+from app.services.result_cache import ResultCache
+from benchmarks.pdfs import make_pdf
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_bytes=40)
+    cache.put("a", {"v": "x" * 10})
+    cache.put("b", {"v": "y" * 10})
+    assert cache.get("a") is not None  # "a" is now most recent
+    cache.put("c", {"v": "z" * 10})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": "x" * 10}
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["memory_bytes"] <= 40
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    ResultCache(max_bytes=1024, disk_dir=str(tmp_path)).put("abcd", {"word_count": 3})
+    cache = ResultCache(max_bytes=1024, disk_dir=str(tmp_path))
+    assert cache.get("abcd") == {"word_count": 3}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("abcd") == {"word_count": 3}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_size_eviction(tmp_path):
+    cache = ResultCache(max_bytes=1024, disk_dir=str(tmp_path), disk_max_bytes=40)
+    for key in ("k1", "k2", "k3"):
+        cache.put(key, {"v": "x" * 10})
+    assert cache.stats()["disk_bytes"] <= 40
+    assert len(list(tmp_path.glob("*/*.json"))) < 3
+
+
+def test_disk_tier_evicts_oldest_down_to_low_water_without_listing(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_cache, "CACHE_DISK_LOW_WATER", 0.5)
+    cache = ResultCache(max_bytes=1, disk_dir=str(tmp_path), disk_max_bytes=100)  # disk tier only
+    # Entries are tracked in memory; the directory is only listed at startup
+    monkeypatch.setattr(Path, "glob", lambda *args: pytest.fail("cache directory listed"))
+    for i in range(7):
+        cache.put(f"k{i}", {"v": "x" * 10})  # 18 bytes each
+        assert cache.get("k0") is not None  # keep k0 recent
+    # The 6th entry crossed 100 bytes and evicted k1..k4 at once, down to 50
+    stats = cache.stats()
+    assert (stats["disk_entries"], stats["disk_bytes"]) == (3, 54)
+    assert sorted(p.stem for p in tmp_path.rglob("*.json")) == ["k0", "k5", "k6"]
+
+
+def test_namespace_separates_results_from_other_settings(tmp_path):
+    ResultCache(max_bytes=1024, disk_dir=str(tmp_path), namespace="ngram=1,1").put("abcd", {"word_count": 3})
+    assert ResultCache(max_bytes=1024, disk_dir=str(tmp_path), namespace="ngram=1,3").get("abcd") is None
+    assert ResultCache(max_bytes=1024, disk_dir=str(tmp_path), namespace="ngram=1,1").get("abcd") == {"word_count": 3}
+
+
+def test_async_access_does_disk_io_off_the_event_loop(monkeypatch, tmp_path):
+    cache = ResultCache(max_bytes=1, disk_dir=str(tmp_path))  # too small to keep anything in memory
+    threads = []
+    for name in ("_disk_get", "_disk_put"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method: threads.append(
+            threading.get_ident()) or method(*args))
+
+    async def run():
+        await cache.put_async("abcd", {"word_count": 3})
+        return await cache.get_async("abcd"), threading.get_ident()
+
+    result, loop_thread = asyncio.run(run())
+    assert result == {"word_count": 3}
+    assert len(threads) == 2 and loop_thread not in threads
+
+
+def test_repeat_upload_served_from_cache(monkeypatch):
+    calls = []
+
+    def fake_process_file(file_path, top_n=5):
+        calls.append(file_path)
+        return "cached text", 2, ["cached", "text"]
+
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "inline")
+    monkeypatch.setattr(upload.PDFProcessor, "process_file", fake_process_file)
+    monkeypatch.setattr(upload, "result_cache", ResultCache(max_bytes=1024))
+    client = TestClient(app)
+    pdf = make_pdf(["repeat me"])
+
+    first = client.post("/upload/", files={"file": ("a.pdf", pdf, "application/pdf")})
+    second = client.post("/upload/", files={"file": ("b.pdf", pdf, "application/pdf")})
+
+    assert first.status_code == second.status_code == 200
+    assert len(calls) == 1
+    assert second.json()["filename"] == "b.pdf"
+    assert second.json()["top_keywords"] == ["cached", "text"]
+    assert client.get("/upload/cache/stats").json()["memory_hits"] == 1
@@ -0,0 +1,136 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import executor, search_index, vector_index
+from app.services.result_cache import ResultCache
+from app.services.search_index import SearchIndex, decode_varints, encode_varints, make_snippet
+from app.routers import upload
+from benchmarks.pdfs import make_pdf
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2 ** 21, 2 ** 35], dtype=np.uint64)
+    data = encode_varints(values)
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 4 + 6
+    assert decode_varints(data).tolist() == values.tolist()
+
+
+def test_bm25_ranks_and_snippets(tmp_path):
+    index = SearchIndex(str(tmp_path))
+    index.add_document("a.pdf", "h1", ["Quarterly revenue grew strongly.", "Staff notes and holidays."])
+    index.add_document("b.pdf", "h2", ["Revenue, revenue and more revenue from consulting."])
+    total, hits = index.search("revenue consulting")
+    assert total == 2
+    assert [(hit["filename"], hit["page"]) for hit in hits] == [("b.pdf", 1), ("a.pdf", 1)]
+    assert "revenue" in hits[1]["snippet"].lower()
+    assert index.search("the and of") == (0, [])
+    assert not index.add_document("a.pdf", "h1", ["duplicate"])
+
+
+def test_segments_merge_in_background_and_survive_restart(tmp_path):
+    index = SearchIndex(str(tmp_path), merge_factor=3)
+    for i in range(7):
+        index.add_document(f"doc{i}.pdf", f"h{i}", [f"common term{i}", f"page two of doc{i}"])
+    index.wait_for_merges()
+    assert index.stats()["segments"] < 7
+    total, hits = index.search("term4")
+    assert (total, hits[0]["filename"]) == (1, "doc4.pdf")
+
+    reopened = SearchIndex(str(tmp_path), merge_factor=3)
+    assert reopened.stats() == index.stats()
+    assert reopened.search("common")[0] == 7
+    assert "h3" in reopened
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == sorted(
+        s.name for s in reopened._segments)
+
+
+def test_documents_without_text_are_remembered_across_restarts(tmp_path):
+    index = SearchIndex(str(tmp_path), merge_factor=2)
+    assert index.add_document("scan.pdf", "empty", ["", "   "])
+    index.add_document("a.pdf", "h1", ["alpha beta"])
+    index.wait_for_merges()
+
+    reopened = SearchIndex(str(tmp_path), merge_factor=2)
+    assert "empty" in reopened
+    assert not reopened.add_document("scan.pdf", "empty", [""])
+    assert reopened.stats()["documents"] == 2
+    assert reopened.search("alpha")[0] == 1
+
+
+def test_merge_streams_segments_larger_than_its_buffers(monkeypatch, tmp_path):
+    monkeypatch.setattr(search_index, "MERGE_BATCH_TERMS", 4)
+    monkeypatch.setattr(search_index, "MERGE_COPY_BYTES", 64)
+    batches = []
+    add_terms = search_index._SegmentWriter.add_terms
+
+    def recording_add_terms(writer, terms, *args):
+        batches.append(list(terms))
+        return add_terms(writer, terms, *args)
+
+    monkeypatch.setattr(search_index._SegmentWriter, "add_terms", recording_add_terms)
+    index = SearchIndex(str(tmp_path / "index"), merge_factor=100)
+    for i in range(5):
+        index.add_document(f"doc{i}.pdf", f"h{i}", [f"shared alpha{i} beta{i % 2} gamma{i}" * 3,
+                                                    f"page two word{i} shared"])
+    expected = {q: index.search(q) for q in ("shared", "alpha3", "beta1", "word0 gamma4")}
+
+    batches.clear()
+    merged = SearchIndex._merge(index._segments, tmp_path / "merged")
+    terms = [term for batch in batches for term in batch]
+    assert max(len(batch) for batch in batches) <= 4
+    assert terms == sorted(set(terms)) == list(merged.iter_terms())
+    assert merged.docs == 10
+    assert merged.doc(9) == {"filename": "doc4.pdf", "page": 2, "text": "page two word4 shared"}
+    index._segments = [merged]
+    assert {q: index.search(q) for q in expected} == expected
+
+
+def test_snippet_centers_on_match():
+    text = " ".join(["filler"] * 100 + ["needle"] + ["filler"] * 100)
+    snippet = make_snippet(text, ["needle"], size=60)
+    assert "needle" in snippet
+    assert snippet.startswith("...") and snippet.endswith("...")
+
+
+def test_search_endpoint_after_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "inline")
+    monkeypatch.setattr(upload, "result_cache", ResultCache(max_bytes=1024))
+    client = TestClient(app)
+    monkeypatch.setattr(search_index, "search_index", None)
+    assert client.get("/search/", params={"q": "revenue"}).status_code == 503
+
+    monkeypatch.setattr(search_index, "search_index", SearchIndex(str(tmp_path)))
+    pdf = make_pdf(["Nothing to see here", "Consulting revenue was strong"])
+    assert client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")}).status_code == 200
+
+    response = client.get("/search/", params={"q": "revenue", "limit": 5})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_hits"] == 1
+    assert body["hits"][0]["filename"] == "report.pdf"
+    assert body["hits"][0]["page"] == 2
+    assert "revenue" in body["hits"][0]["snippet"]
+
+
+def test_cached_upload_is_indexed_into_a_new_index(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "inline")
+    cache = ResultCache(max_bytes=1 << 20)
+    monkeypatch.setattr(upload, "result_cache", cache)
+    client = TestClient(app)
+    pdf = make_pdf(["Consulting revenue was strong"])
+    monkeypatch.setattr(vector_index, "vector_index", None)
+
+    monkeypatch.setattr(search_index, "search_index", SearchIndex(str(tmp_path / "old")))
+    first = client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")})
+    new_index = SearchIndex(str(tmp_path / "new"))
+    monkeypatch.setattr(search_index, "search_index", new_index)
+    second = client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")})
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert new_index.search("revenue")[0] == 1
+
+    third = client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")})
+    assert third.json() == first.json()
+    assert cache.stats()["memory_hits"] == 1
+    assert new_index.stats()["segments"] == 1
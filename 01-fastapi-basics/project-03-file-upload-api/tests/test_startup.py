@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+IMPORT_TIME_BUDGET = 2.0  # seconds for `import app.main` in a fresh interpreter
+
+
+def test_import_is_fast_and_lazy():
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "print(time.perf_counter() - start)\n"
+        "print('PyPDF2' in sys.modules, 'nltk' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True)
+    elapsed, loaded = result.stdout.splitlines()
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+    assert loaded == "False False"
+
+
+def test_ready_only_after_startup():
+    client = TestClient(app)
+    assert client.get("/ready").status_code == 503
+    with TestClient(app) as started:
+        response = started.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready"}
+        assert started.get("/upload/health").status_code == 200
@@ -4,8 +4,8 @@ from app.main import app
 
 client = TestClient(app)
 
-def test_upload_endpoint():
-    with open("sample.pdf", "rb") as f:  # Assume you have a sample.pdf in tests/
+def test_upload_endpoint(pdf_file):
+    with open(pdf_file, "rb") as f:
         response = client.post("/upload/", files={"file": ("sample.pdf", f, "application/pdf")})
     assert response.status_code == 200
-    assert "word_count" in response.json()
\ No newline at end of file
+    assert "word_count" in response.json()
@@ -0,0 +1,53 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import upload
+from app.services import upload_io
+from app.services.upload_io import UploadTooLargeError, receive_upload
+
+
+def receive(data, tmp_path, **kwargs):
+    file = UploadFile(io.BytesIO(data), filename="doc.pdf")
+    return asyncio.run(receive_upload(file, tmp_path, **kwargs))
+
+
+def test_small_upload_stays_in_memory(tmp_path):
+    data = b"%PDF small"
+    stored = receive(data, tmp_path, spool_max_bytes=1024)
+    assert stored.source == data
+    assert stored.content_hash == hashlib.sha256(data).hexdigest()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_large_upload_spools_to_unique_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_io, "CHUNK_SIZE", 4)
+    data = b"%PDF" + b"x" * 30
+    first = receive(data, tmp_path, spool_max_bytes=8)
+    second = receive(data, tmp_path, spool_max_bytes=8)
+    assert first.path != second.path
+    assert first.path.read_bytes() == data
+    assert (first.size, first.content_hash) == (len(data), hashlib.sha256(data).hexdigest())
+    with first, second:
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_upload_rejected_and_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_io, "CHUNK_SIZE", 4)
+    with pytest.raises(UploadTooLargeError):
+        receive(b"y" * 40, tmp_path, max_bytes=20, spool_max_bytes=8)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_endpoint_returns_413(monkeypatch, tmp_path):
+    monkeypatch.setattr(upload, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(upload_io, "MAX_UPLOAD_BYTES", 16)
+    response = TestClient(app).post("/upload/", files={"file": ("big.pdf", b"z" * 64, "application/pdf")})
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,124 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import upload
+from app.services import executor, search_index, vector_index
+from app.services.result_cache import ResultCache
+from app.services.vector_index import HashingEmbedder, IVFQuantizer, VectorIndex, chunk_text, exact_search
+from benchmarks.pdfs import make_pdf
+
+
+def test_chunks_overlap():
+    words = [f"w{i}" for i in range(250)]
+    chunks = chunk_text(" ".join(words), chunk_words=100, overlap=20)
+    assert [len(chunk.split()) for chunk in chunks] == [100, 100, 90]
+    assert chunks[1].split()[:20] == words[80:100]
+    assert chunk_text("   ") == []
+
+
+def test_embeddings_are_normalized_and_stable():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(["consulting revenue grew", "consulting revenue grew", "the and of"])
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()  # stopwords only
+
+
+def test_exact_search_matches_brute_force_across_blocks():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1000, 16)).astype(np.float32)
+    queries = rng.standard_normal((3, 16)).astype(np.float32)
+    ids, scores = exact_search(vectors, queries, k=5, block_rows=128)
+    expected = np.argsort(-(queries @ vectors.T), axis=1)[:, :5]
+    assert ids.tolist() == expected.tolist()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_ivf_finds_neighbours_in_probed_clusters():
+    rng = np.random.default_rng(1)
+    centers = rng.standard_normal((8, 32)).astype(np.float32)
+    vectors = (np.repeat(centers, 100, axis=0) + 0.05 * rng.standard_normal((800, 32))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ivf = IVFQuantizer.train(vectors, nlist=8)
+    truth, _ = exact_search(vectors, vectors[:20], k=10)
+    for query, expected in zip(vectors[:20], truth):
+        ids, _ = ivf.search(vectors, query, k=10, nprobe=2)
+        assert set(ids) == set(expected)
+
+
+def test_index_persists_and_trains_ivf(tmp_path):
+    index = VectorIndex(str(tmp_path), embedder=HashingEmbedder(dim=64), ivf_min_rows=4)
+    assert index.add_document("a.pdf", "h1", "consulting revenue grew strongly " * 100) > 1
+    assert index.add_document("b.pdf", "h2", "cats and dogs sleep all day " * 100) > 1
+    assert index.add_document("a.pdf", "h1", "duplicate") == 0
+    index.wait_for_training()
+    assert index.stats()["ivf_lists"] > 0
+
+    mode, hits = index.search("dogs sleeping", k=3)
+    assert mode == "ivf"
+    assert hits[0]["filename"] == "b.pdf"
+    assert index.search("dogs sleeping", k=3, mode="exact")[1][0]["filename"] == "b.pdf"
+
+    # Rows appended without a committed documents.jsonl entry are discarded on reopen
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\0" * 64 * 4)
+    reopened = VectorIndex(str(tmp_path), embedder=HashingEmbedder(dim=64))
+    assert reopened.stats() == index.stats()
+    assert reopened.search("consulting revenue", k=1)[1][0]["filename"] == "a.pdf"
+
+
+def test_similar_endpoint_after_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "inline")
+    monkeypatch.setattr(upload, "result_cache", ResultCache(max_bytes=1024))
+    client = TestClient(app)
+    monkeypatch.setattr(vector_index, "vector_index", None)
+    assert client.get("/similar/", params={"q": "revenue"}).status_code == 503
+
+    monkeypatch.setattr(vector_index, "vector_index", VectorIndex(str(tmp_path)))
+    pdf = make_pdf(["Consulting revenue was strong this quarter"])
+    assert client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")}).status_code == 200
+
+    response = client.get("/similar/", params={"q": "consulting revenue", "k": 3})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["mode"] == "exact"  # too few chunks for IVF yet
+    assert body["hits"][0]["filename"] == "report.pdf"
+    assert body["hits"][0]["score"] > 0
+
+
+def test_cached_upload_is_embedded_into_a_new_index(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "inline")
+    monkeypatch.setattr(upload, "result_cache", ResultCache(max_bytes=1 << 20))
+    monkeypatch.setattr(search_index, "search_index", None)
+    client = TestClient(app)
+    pdf = make_pdf(["Consulting revenue was strong this quarter"])
+
+    monkeypatch.setattr(vector_index, "vector_index", VectorIndex(str(tmp_path / "old")))
+    first = client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")})
+    new_index = VectorIndex(str(tmp_path / "new"))
+    monkeypatch.setattr(vector_index, "vector_index", new_index)
+    second = client.post("/upload/", files={"file": ("report.pdf", pdf, "application/pdf")})
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert new_index.search("consulting revenue", k=1)[1][0]["filename"] == "report.pdf"
+
+
+def test_upload_without_text_is_served_from_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "EXECUTION_MODE", "inline")
+    cache = ResultCache(max_bytes=1 << 20)
+    monkeypatch.setattr(upload, "result_cache", cache)
+    monkeypatch.setattr(search_index, "search_index", search_index.SearchIndex(str(tmp_path / "search")))
+    monkeypatch.setattr(vector_index, "vector_index", VectorIndex(str(tmp_path / "vectors")))
+    client = TestClient(app)
+    pdf = make_pdf([""])
+
+    first = client.post("/upload/", files={"file": ("scan.pdf", pdf, "application/pdf")})
+    second = client.post("/upload/", files={"file": ("scan.pdf", pdf, "application/pdf")})
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert cache.stats()["memory_hits"] == 1
+
+    reopened = VectorIndex(str(tmp_path / "vectors"))
+    assert reopened.stats()["documents"] == 1
+    assert len(reopened) == 0